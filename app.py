@@ -2,15 +2,33 @@
 #  FINAL APP.PY - With corrected db initialization for Migrate
 # ==============================================================================
 import os
+import csv
+import io
+import json
+import time
+import hashlib
+import pickle
+import sqlite3
+import tempfile
 import uuid
+import select
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from itertools import islice
+import click
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, make_response, g, send_from_directory, Response, stream_with_context, has_request_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate # Import Migrate
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, tuple_, insert, update, event, DDL, orm, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
+from PIL import Image, ImageOps, features
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
 
 # --- App & DB Setup ---
 app = Flask(__name__, instance_relative_config=True)
@@ -18,10 +36,46 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a-default-secret-key-fo
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+app.config['IMAGE_VARIANT_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'variants')
+app.config['IMAGE_VARIANT_SIZES'] = {'thumb': 160, 'medium': 640}
+app.config['IMAGE_VARIANT_FORMAT'] = 'webp' if features.check('webp') else 'jpeg'
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+app.config['DEFAULT_PAGE_SIZE'] = 50
+app.config['MAX_PAGE_SIZE'] = 200
+app.config['EXPORT_CHUNK_SIZE'] = 1000
+app.config['IMPORT_BATCH_SIZE'] = 1000
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 0))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['RESPONSE_CACHE_BACKEND'] = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+app.config['RESPONSE_CACHE_PATH'] = os.environ.get('RESPONSE_CACHE_PATH', os.path.join(app.instance_path, 'response_cache.sqlite'))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))
+app.config['EVENT_POLL_SECONDS'] = float(os.environ.get('EVENT_POLL_SECONDS', 1))
+app.config['EVENT_HEARTBEAT_SECONDS'] = 10
+app.config['EVENT_REPLAY_LIMIT'] = 500
+app.config['EVENT_RETENTION_HOURS'] = int(os.environ.get('EVENT_RETENTION_HOURS', 24))
+app.config['EVENT_MAX_STREAMS'] = int(os.environ.get('EVENT_MAX_STREAMS', 4))
+app.config['EVENT_STREAM_SECONDS'] = int(os.environ.get('EVENT_STREAM_SECONDS', 300))
+app.config['EVENT_BUSY_RETRY_MS'] = 30000
+def database_url(name):
+    url = os.environ.get(name)
+    if url and url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+def engine_options(url, statement_timeout_ms):
+    # Each gunicorn worker gets its own pool (see gunicorn.conf.py, which sizes DB_POOL_SIZE to its thread count).
+    options = {'pool_pre_ping': True, 'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800))}
+    if url.startswith('postgresql'):
+        options.update(pool_size=int(os.environ.get('DB_POOL_SIZE', 5)), max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 5)), pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 10)))
+        if statement_timeout_ms: options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+    return options
+DATABASE_URL = database_url('DATABASE_URL')
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or 'sqlite:///your_database.db'
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0)))
+# Optional read replica for long reporting reads (the order export). Without it they run on the primary.
+REPORTING_DATABASE_URL = database_url('REPORTING_DATABASE_URL')
+if REPORTING_DATABASE_URL:
+    app.config['SQLALCHEMY_BINDS'] = {'reporting': {'url': REPORTING_DATABASE_URL, **engine_options(REPORTING_DATABASE_URL, int(os.environ.get('REPORTING_STATEMENT_TIMEOUT_MS', 0)))}}
 
 # --- CORRECTED INITIALIZATION ---
 db = SQLAlchemy(app)
@@ -30,7 +84,14 @@ migrate = Migrate(app, db)
 # ==============================================================================
 #  DATABASE MODELS (CORRECTED)
 # ==============================================================================
+# Name searches use ilike('%term%'), which only a trigram index can serve. These exist on Postgres only;
+# SQLite falls back to a plain LIKE scan.
+event.listen(db.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+def trigram_index(name, column):
+    return db.Index(name, column, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
 class Product(db.Model):
+    __table_args__ = (trigram_index('ix_product_name_trgm', 'name'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
     description = db.Column(db.Text, nullable=True)
@@ -42,16 +103,17 @@ class Product(db.Model):
 
 class ProductVariant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     stock = db.Column(db.Integer, nullable=False, default=0)
 
 class ProductImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     filename = db.Column(db.String(100), nullable=False)
 
 class Customer(db.Model):
+    __table_args__ = (trigram_index('ix_customer_name_trgm', 'name'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(50), nullable=True)
@@ -60,35 +122,397 @@ class Customer(db.Model):
 
 class CustomerOrder(db.Model):
     __tablename__ = 'customer_order'
+    __table_args__ = (db.Index('ix_customer_order_order_date_id', 'order_date', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     order_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     total_value = db.Column(db.Float, nullable=False, default=0.0)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True, index=True)
     status = db.Column(db.String(50), nullable=False, default='Not in-process')
     delivery_method = db.Column(db.String(50), nullable=False, default='Delivery')
+    # Orders written before stock was reserved at checkout never took any, so editing or deleting them must not give any back.
+    stock_reserved = db.Column(db.Boolean, nullable=False, default=True)
     items = db.relationship('OrderItem', backref='customer_order', lazy='dynamic', cascade="all, delete-orphan")
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('customer_order.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('customer_order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     variant_id = db.Column(db.Integer, db.ForeignKey('product_variant.id'), nullable=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     price_per_item = db.Column(db.Float, nullable=False)
     product = db.relationship('Product')
     variant = db.relationship('ProductVariant')
 
+ORDER_STATUSES = ['Not in-process', 'Processing', 'Completed']
+
+class DailyRevenue(db.Model):
+    # Per-day rollup of customer_order, maintained by the order write routes and rebuilt by `flask backfill-revenue`.
+    __tablename__ = 'daily_revenue'
+    day = db.Column(db.Date, primary_key=True)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+class OrderEvent(db.Model):
+    # Outbox behind /api/events: one row per order change, written in the change's own transaction. The id doubles as
+    # the SSE event id, so reconnecting clients resume with Last-Event-ID. Rows older than EVENT_RETENTION_HOURS are pruned.
+    __tablename__ = 'order_event'
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    type = db.Column(db.String(30), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+
+class ResourceVersion(db.Model):
+    # Write counters per API resource ('products', 'stock', 'customers', 'orders'); read routes derive their ETags from these.
+    __tablename__ = 'resource_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# ==============================================================================
+#  INSTRUMENTATION
+# ==============================================================================
+# gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR so every worker writes its samples there and /metrics sums them.
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by endpoint.', ['endpoint', 'method'])
+REQUESTS = Counter('http_requests_total', 'Requests by endpoint and status.', ['endpoint', 'method', 'status'])
+REQUEST_STATEMENTS = Histogram('http_request_db_statements', 'SQL statements issued per request.', ['endpoint'], buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250))
+DB_TIME = Counter('db_query_seconds_total', 'Time spent executing SQL by endpoint.', ['endpoint'])
+CACHE_LOOKUPS = Counter('response_cache_lookups_total', 'Response cache lookups by cached route and result.', ['route', 'result'])
+def metrics_endpoint():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context rather than the connection, so a statement that raises (and never
+    # reaches after_cursor_execute) leaves nothing behind on the pooled connection.
+    context.query_started = time.perf_counter()
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_started
+    if not has_request_context(): return
+    g.db_statements = g.get('db_statements', 0) + 1
+    g.db_time = g.get('db_time', 0.0) + elapsed
+    if app.config['SLOW_QUERY_MS'] and elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        app.logger.warning('Slow query (%.1f ms) on %s %s: %s params=%r', elapsed * 1000, request.method, metrics_endpoint(), statement, parameters)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g: return response
+    elapsed, endpoint = time.perf_counter() - g.request_started, metrics_endpoint()
+    statements, db_time = g.get('db_statements', 0), g.get('db_time', 0.0)
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(elapsed)
+    REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    REQUEST_STATEMENTS.labels(endpoint).observe(statements)
+    DB_TIME.labels(endpoint).inc(db_time)
+    response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}, db;dur={db_time * 1000:.1f};desc="{statements} queries"'
+    return response
+
+# ==============================================================================
+#  RESPONSE CACHE
+# ==============================================================================
+class MemoryCacheBackend:
+    # Per-worker LRU dict; entries past their expiry are dropped on read.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None: return None
+            value, expires = item
+            if expires <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [k for k in self.entries if k.startswith(prefix)]: del self.entries[key]
+class SQLiteCacheBackend:
+    # Local SQLite file shared by every worker on the host. Connections are per thread and reopened after fork.
+    def __init__(self, path, max_entries):
+        self.path, self.max_entries = path, max_entries
+        self.local = threading.local()
+    def connect(self):
+        if getattr(self.local, 'pid', None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)')
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return self.local.conn
+    def get(self, key):
+        conn, now = self.connect(), time.time()
+        row = conn.execute('SELECT value FROM response_cache WHERE key = ? AND expires > ?', (key, now)).fetchone()
+        if row is None: return None
+        conn.execute('UPDATE response_cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(row[0])
+    def set(self, key, value, ttl):
+        conn, now = self.connect(), time.time()
+        conn.execute('INSERT OR REPLACE INTO response_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)', (key, pickle.dumps(value), now + ttl, now))
+        conn.execute('DELETE FROM response_cache WHERE expires <= ? OR key IN (SELECT key FROM response_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (now, self.max_entries))
+    def delete_prefix(self, prefix):
+        self.connect().execute('DELETE FROM response_cache WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+class ResponseCache:
+    # Caches whole 200 responses of read routes that are identical for every logged-in user. Keys carry the
+    # resource versions the route depends on, so a write elsewhere can never be answered from a stale entry;
+    # bump_versions() also drops the dependent entries explicitly to free the space.
+    def __init__(self, backend, ttl):
+        self.backend, self.ttl = backend, ttl
+        self.dependents = {}
+        self.hits = self.misses = 0
+    def cached(self, name, *resources):
+        for resource in resources: self.dependents.setdefault(resource, set()).add(name)
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = f'{name}|{resource_versions(*resources)}|{datetime.utcnow().date()}|{request.full_path}'
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    CACHE_LOOKUPS.labels(name, 'hit').inc()
+                    body, mimetype = entry
+                    return app.response_class(body, mimetype=mimetype)
+                self.misses += 1
+                CACHE_LOOKUPS.labels(name, 'miss').inc()
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200: self.backend.set(key, (response.get_data(), response.mimetype), self.ttl)
+                return response
+            return decorated_function
+        return decorator
+    def invalidate(self, *resources):
+        for name in set().union(*(self.dependents.get(resource, set()) for resource in resources)):
+            self.backend.delete_prefix(f'{name}|')
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'backend': app.config['RESPONSE_CACHE_BACKEND'], 'pid': os.getpid(), 'hits': self.hits, 'misses': self.misses, 'hit_ratio': round(self.hits / lookups, 3) if lookups else None}
+if app.config['RESPONSE_CACHE_BACKEND'] == 'sqlite':
+    response_cache = ResponseCache(SQLiteCacheBackend(app.config['RESPONSE_CACHE_PATH'], app.config['RESPONSE_CACHE_MAX_ENTRIES']), app.config['RESPONSE_CACHE_TTL'])
+else:
+    response_cache = ResponseCache(MemoryCacheBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES']), app.config['RESPONSE_CACHE_TTL'])
+
 # ==============================================================================
 #  Helper Functions & Core Routes
 # ==============================================================================
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+image_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image-variants')
+# Per-worker bookkeeping so each upload is queued once at a time, and one that could not be decoded is not retried on every view.
+image_jobs_lock = threading.Lock()
+image_jobs_pending, image_jobs_failed = set(), set()
+def variant_filename(filename, size):
+    return f"{filename.rsplit('.', 1)[0]}_{size}.{app.config['IMAGE_VARIANT_FORMAT']}"
+def queue_image_variants(filename):
+    with image_jobs_lock:
+        if filename in image_jobs_pending or filename in image_jobs_failed: return
+        image_jobs_pending.add(filename)
+    image_executor.submit(generate_image_variants, filename)
+def generate_image_variants(filename):
+    # Runs on the image worker pool. Each variant is written to its own temp file and renamed into place, so a
+    # half-written file is never served, even if another worker process is rendering the same upload.
+    upload_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    try:
+        os.makedirs(app.config['IMAGE_VARIANT_FOLDER'], exist_ok=True)
+        with Image.open(upload_path) as original:
+            original = ImageOps.exif_transpose(original)
+            for size, pixels in app.config['IMAGE_VARIANT_SIZES'].items():
+                variant = original.copy()
+                variant.thumbnail((pixels, pixels))
+                variant = variant.convert('RGBA' if app.config['IMAGE_VARIANT_FORMAT'] == 'webp' and 'A' in variant.getbands() else 'RGB')
+                fd, temp_path = tempfile.mkstemp(dir=app.config['IMAGE_VARIANT_FOLDER'], suffix='.tmp')
+                os.close(fd)
+                try:
+                    variant.save(temp_path, format=app.config['IMAGE_VARIANT_FORMAT'], quality=82)
+                    os.replace(temp_path, os.path.join(app.config['IMAGE_VARIANT_FOLDER'], variant_filename(filename, size)))
+                except Exception:
+                    os.remove(temp_path)
+                    raise
+        # Deleting an image removes the upload before its variants, so if the upload is gone now, the delete may have
+        # missed the files written above; remove them here (in this or any other worker process).
+        if not os.path.exists(upload_path): remove_image_files(filename)
+    except FileNotFoundError:
+        pass  # deleted before the job started
+    except Exception:
+        app.logger.exception('Could not generate image variants for %s', filename)
+        with image_jobs_lock: image_jobs_failed.add(filename)
+    finally:
+        with image_jobs_lock: image_jobs_pending.discard(filename)
+def save_uploaded_images(product, files):
+    for file in files:
+        if file and allowed_file(file.filename):
+            ext = file.filename.rsplit('.', 1)[1].lower()
+            unique_filename = f"{uuid.uuid4()}.{ext}"
+            file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
+            product.images.append(ProductImage(filename=unique_filename))
+            queue_image_variants(unique_filename)
+def remove_image_files(filename):
+    paths = [os.path.join(app.config['UPLOAD_FOLDER'], filename)] + [os.path.join(app.config['IMAGE_VARIANT_FOLDER'], variant_filename(filename, size)) for size in app.config['IMAGE_VARIANT_SIZES']]
+    for path in paths:
+        try: os.remove(path)
+        except OSError: pass
+def image_url(filename, size):
+    return url_for('media', size=size, filename=filename) if filename else None
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not session.get('logged_in'): return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
+def serialize_product_listing(query, limit=None):
+    # Bulk read path for listings: the stock total and first image are correlated subqueries, evaluated only for the
+    # rows the LIMIT keeps, and variants are loaded in one IN query, so the query count stays constant however many products match.
+    stock = db.session.query(func.sum(ProductVariant.stock)).filter(ProductVariant.product_id == Product.id).correlate(Product).scalar_subquery()
+    thumbnail = db.session.query(ProductImage.filename).filter(ProductImage.product_id == Product.id).order_by(ProductImage.id).limit(1).correlate(Product).scalar_subquery()
+    rows = query.add_columns(stock, thumbnail)
+    if limit is not None:
+        rows = rows.limit(limit)
+    rows = rows.all()
+    variant_product_ids = [p.id for p, _, _ in rows if p.has_variants]
+    variants_by_product = {}
+    if variant_product_ids:
+        for v in ProductVariant.query.filter(ProductVariant.product_id.in_(variant_product_ids)).order_by(ProductVariant.id):
+            variants_by_product.setdefault(v.product_id, []).append({'id': v.id, 'name': v.name, 'stock': v.stock})
+    results = []
+    for p, variant_stock, thumbnail in rows:
+        product_data = {'id': p.id, 'name': p.name, 'price': p.price, 'stock': (variant_stock or 0) if p.has_variants else p.simple_stock, 'has_variants': p.has_variants, 'thumbnail': thumbnail, 'thumbnail_url': image_url(thumbnail, 'thumb')}
+        if p.has_variants:
+            product_data['variants'] = variants_by_product.get(p.id, [])
+        results.append(product_data)
+    return results
+def order_summary_query(query):
+    # Flat rows for order listings: the customer is joined in and the item count is a correlated COUNT,
+    # so a page of orders costs one query instead of a customer load and a COUNT per order.
+    item_count = db.session.query(func.count(OrderItem.id)).filter(OrderItem.order_id == CustomerOrder.id).correlate(CustomerOrder).scalar_subquery()
+    return (query.outerjoin(Customer, Customer.id == CustomerOrder.customer_id)
+            .with_entities(CustomerOrder.id, Customer.name.label('customer_name'), CustomerOrder.order_date, CustomerOrder.total_value, item_count.label('item_count'), CustomerOrder.status, CustomerOrder.delivery_method))
+def serialize_order_summary(o):
+    return {'id': o.id, 'customer_name': o.customer_name or 'N/A', 'date': o.order_date.strftime('%d %b %Y'), 'total_value': f'{o.total_value:.2f}', 'item_count': o.item_count, 'status': o.status, 'delivery_method': o.delivery_method, 'order_date': o.order_date.isoformat()}
+def upsert(model):
+    return (postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert)(model)
+def record_revenue(order_date, value_delta, count_delta=0):
+    # Upsert so concurrent writers on the same day add to the row instead of racing to create it.
+    if not value_delta and not count_delta: return
+    stmt = upsert(DailyRevenue).values(day=order_date.date(), total_value=value_delta, order_count=count_delta)
+    stmt = stmt.on_conflict_do_update(index_elements=[DailyRevenue.day], set_={'total_value': DailyRevenue.total_value + stmt.excluded.total_value, 'order_count': DailyRevenue.order_count + stmt.excluded.order_count})
+    db.session.execute(stmt)
+def bump_versions(*names):
+    # Runs inside the write's transaction, so the new version becomes visible together with the data it describes.
+    # Each upsert holds its row lock until commit, so call it last and rows are always taken in the same order.
+    for name in sorted(set(names)):
+        stmt = upsert(ResourceVersion).values(name=name, version=1)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[ResourceVersion.name], set_={'version': ResourceVersion.version + 1}))
+    g.pop('resource_versions', None)
+    response_cache.invalidate(*names)
+def resource_versions(*names):
+    # Memoized per request so the ETag check, the response cache and the search index share one lookup.
+    cache = g.setdefault('resource_versions', {})
+    missing = [name for name in names if name not in cache]
+    if missing:
+        cache.update({name: 0 for name in missing})
+        cache.update(db.session.query(ResourceVersion.name, ResourceVersion.version).filter(ResourceVersion.name.in_(missing)).all())
+    return tuple(cache[name] for name in names)
+def conditional_get(*resources):
+    # Strong ETag from the resource versions, the full request path (page, filters) and the current date
+    # (revenue buckets move with it). A matching If-None-Match is answered before the view runs any query.
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            stamp = f'{resources}:{resource_versions(*resources)}:{datetime.utcnow().date()}:{request.full_path}'
+            etag = hashlib.sha1(stamp.encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200: return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+def month_starts(today, count):
+    starts = []
+    for i in range(count - 1, -1, -1):
+        year, month = divmod(today.year * 12 + today.month - 1 - i, 12)
+        starts.append(datetime(year, month + 1, 1))
+    return starts
+def rebuild_daily_revenue():
+    day = func.date(CustomerOrder.order_date)
+    db.session.query(DailyRevenue).delete()
+    db.session.execute(insert(DailyRevenue).from_select(['day', 'total_value', 'order_count'], db.session.query(day, func.sum(CustomerOrder.total_value), func.count(CustomerOrder.id)).group_by(day)))
+    bump_versions('orders')
+    db.session.commit()
+@app.cli.command('backfill-revenue')
+def backfill_revenue():
+    """Rebuild the daily_revenue rollup from customer_order with a single GROUP BY (manual repair only)."""
+    rebuild_daily_revenue()
+    print(f'Backfilled {DailyRevenue.query.count()} days of revenue.')
+class InvalidQueryParam(ValueError):
+    pass
+def get_page_limit():
+    limit = request.args.get('limit', app.config['DEFAULT_PAGE_SIZE'], type=int)
+    return max(1, min(limit, app.config['MAX_PAGE_SIZE']))
+def get_date_arg(name):
+    value = request.args.get(name)
+    if not value: return None
+    try: return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError: raise InvalidQueryParam(f"'{name}' must be a date in YYYY-MM-DD format.")
+def get_id_cursor():
+    after = request.args.get('after')
+    if not after: return None
+    try: return int(after)
+    except ValueError: raise InvalidQueryParam("Invalid 'after' cursor.")
+def get_order_cursor():
+    # Orders are listed newest first, so their cursor is the (order_date, id) pair of the last row seen.
+    after = request.args.get('after')
+    if not after: return None
+    try:
+        order_date, order_id = after.rsplit(',', 1)
+        return datetime.fromisoformat(order_date), int(order_id)
+    except ValueError: raise InvalidQueryParam("Invalid 'after' cursor.")
+def reporting_session():
+    # Request-scoped session on the reporting replica, closed at teardown; the primary session when there is none.
+    if 'reporting' not in db.engines: return db.session
+    if 'reporting_session' not in g: g.reporting_session = orm.Session(db.engines['reporting'])
+    return g.reporting_session
+@app.teardown_appcontext
+def close_reporting_session(exc):
+    reporting = g.pop('reporting_session', None)
+    if reporting is not None: reporting.close()
+def filtered_orders_query(session=None):
+    query = (session or db.session).query(CustomerOrder)
+    for field in ('status', 'delivery_method'):
+        value = request.args.get(field)
+        if value: query = query.filter(getattr(CustomerOrder, field) == value)
+    customer_id = request.args.get('customer_id', type=int)
+    if customer_id: query = query.filter(CustomerOrder.customer_id == customer_id)
+    date_from, date_to = get_date_arg('date_from'), get_date_arg('date_to')
+    if date_from: query = query.filter(CustomerOrder.order_date >= date_from)
+    if date_to: query = query.filter(CustomerOrder.order_date < date_to + timedelta(days=1))
+    return query
+def order_cursor(order): return f'{order.order_date.isoformat()},{order.id}'
+@app.errorhandler(InvalidQueryParam)
+def handle_invalid_query_param(e): return jsonify({'success': False, 'message': str(e)}), 400
+@app.route('/media/<size>/<filename>')
+def media(size, filename):
+    # Variant names derive from the upload's UUID, so a generated variant never changes and can be cached forever.
+    # Until the pool has produced it (or for uploads that predate variants) the original is served uncached.
+    if size not in app.config['IMAGE_VARIANT_SIZES']: return jsonify({'success': False, 'message': 'Unknown image size.'}), 404
+    filename = secure_filename(filename)
+    if os.path.exists(os.path.join(app.config['IMAGE_VARIANT_FOLDER'], variant_filename(filename, size))):
+        response = send_from_directory(app.config['IMAGE_VARIANT_FOLDER'], variant_filename(filename, size), max_age=31536000)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+    if not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)): return jsonify({'success': False, 'message': 'Image not found.'}), 404
+    queue_image_variants(filename)
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=0)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if session.get('logged_in'): return redirect(url_for('dashboard'))
@@ -105,10 +529,11 @@ def logout():
     return redirect(url_for('login'))
 @app.route('/')
 @login_required
+@response_cache.cached('dashboard', 'orders', 'customers')
 def dashboard():
-    total_revenue = db.session.query(func.sum(CustomerOrder.total_value)).scalar() or 0.0
-    total_orders = CustomerOrder.query.count()
-    recent_orders = CustomerOrder.query.order_by(CustomerOrder.order_date.desc()).limit(5).all()
+    total_revenue, total_orders = db.session.query(func.sum(DailyRevenue.total_value), func.sum(DailyRevenue.order_count)).one()
+    total_revenue, total_orders = total_revenue or 0.0, total_orders or 0
+    recent_orders = order_summary_query(CustomerOrder.query).order_by(CustomerOrder.order_date.desc(), CustomerOrder.id.desc()).limit(5).all()
     return render_template('index.html', total_revenue=f'{total_revenue:.2f}', total_orders=total_orders, recent_orders=recent_orders)
 @app.route('/products')
 @login_required
@@ -135,36 +560,365 @@ def ui_order_form(): return render_template('order_form.html')
 @login_required
 def ui_view_order_modal(): return render_template('view_order_modal.html')
 
+# ==============================================================================
+#  PRODUCT SEARCH INDEX
+# ==============================================================================
+class ProductSearchIndex:
+    # In-process trigram index over product names for the order form typeahead. It is rebuilt on the first search
+    # after the 'products' resource version moves, so every worker sees writes made by the others.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries, self.trigrams, self.version = {}, {}, None
+    @staticmethod
+    def grams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    def ensure_fresh(self):
+        version = resource_versions('products')
+        if version == self.version: return
+        with self.lock:
+            if version == self.version: return
+            entries, trigrams = {}, {}
+            for p in serialize_product_listing(Product.query):
+                entries[p['id']] = {'id': p['id'], 'name': p['name'], 'price': p['price'], 'thumbnail': p['thumbnail'], 'thumbnail_url': p['thumbnail_url'], 'has_variants': p['has_variants'], 'variants': [{'id': v['id'], 'name': v['name']} for v in p.get('variants', [])], 'key': p['name'].lower()}
+                for gram in self.grams(entries[p['id']]['key']): trigrams.setdefault(gram, set()).add(p['id'])
+            # The version was read before the catalog, so a write that lands mid-rebuild triggers another rebuild.
+            self.entries, self.trigrams, self.version = entries, trigrams, version
+    def search(self, term, limit):
+        self.ensure_fresh()
+        term = term.lower().strip()
+        entries = self.entries
+        if len(term) >= 3:
+            candidate_sets = [self.trigrams.get(gram, set()) for gram in self.grams(term)]
+            candidates = (entries[i] for i in set.intersection(*candidate_sets))
+        else:
+            candidates = entries.values()
+        ranked = []
+        for entry in candidates:
+            key = entry['key']
+            if key.startswith(term): rank = 0
+            elif any(word.startswith(term) for word in key.split()): rank = 1
+            elif term in key: rank = 2
+            else: continue
+            ranked.append((rank, len(key), key, entry))
+        ranked.sort(key=lambda r: r[:3])
+        return [{k: v for k, v in entry.items() if k != 'key'} for *_, entry in ranked[:limit]]
+product_search_index = ProductSearchIndex()
+
+# ==============================================================================
+#  ORDER WRITING
+# ==============================================================================
+class OrderError(ValueError):
+    pass
+def load_order_catalog(orders_data):
+    # Every product and variant referenced by the request, one IN query each, however many lines or orders it has.
+    lines = [item_data for order_data in orders_data for item_data in order_data['items']]
+    product_ids = {int(item_data['product_id']) for item_data in lines}
+    variant_ids = {int(item_data['variant_id']) for item_data in lines if item_data.get('variant_id')}
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids))} if product_ids else {}
+    variants = {v.id: v for v in ProductVariant.query.filter(ProductVariant.id.in_(variant_ids))} if variant_ids else {}
+    return products, variants
+def order_lines(items_data, products, variants):
+    lines = {}
+    for item_data in items_data:
+        product = products.get(int(item_data['product_id']))
+        if not product: raise OrderError(f"Product {item_data['product_id']} not found.")
+        quantity = int(item_data['quantity'])
+        if quantity < 1: raise OrderError(f'Quantity for {product.name} must be at least 1.')
+        variant_id = None
+        if product.has_variants:
+            variant = variants.get(int(item_data['variant_id'])) if item_data.get('variant_id') else None
+            if not variant or variant.product_id != product.id: raise OrderError(f'Choose a valid variant for {product.name}.')
+            variant_id = variant.id
+        lines[(product.id, variant_id)] = lines.get((product.id, variant_id), 0) + quantity
+    return lines
+def adjust_stock(deltas, products, variants):
+    # deltas maps (product_id, variant_id) to units to take (positive) or give back (negative). Taking stock is a
+    # conditional UPDATE ... WHERE stock >= qty, so two orders racing for the last unit cannot both succeed, and
+    # rows are touched in key order so concurrent writers lock them in the same sequence. Returns whether any stock
+    # moved; the caller then bumps the 'stock' version just before commit (it has its own version so the product
+    # listing is revalidated without also invalidating the catalog-only search index).
+    for (product_id, variant_id), delta in sorted(deltas.items(), key=lambda kv: (kv[0][0], kv[0][1] or 0)):
+        if not delta: continue
+        model, row_id, column = (ProductVariant, variant_id, ProductVariant.stock) if variant_id else (Product, product_id, Product.simple_stock)
+        stmt = update(model).where(model.id == row_id).values({column: column - delta})
+        if delta > 0: stmt = stmt.where(column >= delta)
+        result = db.session.execute(stmt.execution_options(synchronize_session=False))
+        if delta > 0 and result.rowcount == 0:
+            name = f'{products[product_id].name} ({variants[variant_id].name})' if variant_id else products[product_id].name
+            raise OrderError(f'Not enough stock for {name}.')
+    return any(deltas.values())
+def write_order_items(order, items_data, products, variants, existing_items=()):
+    # Applies only the difference against the order's current lines: unchanged lines keep their row and price and
+    # changed quantities are updated in place. Returns the per-line stock deltas for adjust_stock (none for orders
+    # that never reserved stock), so a batch can apply all of its orders' deltas in one pass.
+    lines = order_lines(items_data, products, variants)
+    existing = {}
+    for item in existing_items:
+        key = (item.product_id, item.variant_id)
+        if key in existing:
+            existing[key].quantity += item.quantity
+            db.session.delete(item)
+        else:
+            existing[key] = item
+    deltas = {key: lines.get(key, 0) - (existing[key].quantity if key in existing else 0) for key in set(lines) | set(existing)} if order.stock_reserved else {}
+    total_value = 0
+    for key, item in existing.items():
+        if key not in lines: db.session.delete(item)
+        else:
+            item.quantity = lines[key]
+            total_value += item.price_per_item * item.quantity
+    for (product_id, variant_id), quantity in lines.items():
+        if (product_id, variant_id) in existing: continue
+        db.session.add(OrderItem(customer_order=order, product_id=product_id, variant_id=variant_id, quantity=quantity, price_per_item=products[product_id].price))
+        total_value += products[product_id].price * quantity
+    order.total_value = total_value
+    return deltas
+
+# ==============================================================================
+#  ORDER EVENTS
+# ==============================================================================
+ORDER_EVENT_CHANNEL = 'order_events'
+def order_event_payloads(order_ids):
+    # Same shape as an /api/orders row, so clients render it with the code that renders the list.
+    return [serialize_order_summary(o) for o in order_summary_query(CustomerOrder.query.filter(CustomerOrder.id.in_(order_ids))).order_by(CustomerOrder.id)]
+def publish_order_events(event_type, payloads):
+    # Rows become visible to the brokers when the write commits, and NOTIFY is delivered at commit too, so a rolled
+    # back write never publishes anything. Without Postgres the brokers find new rows by polling.
+    db.session.add_all(OrderEvent(type=event_type, data=json.dumps(payload)) for payload in payloads)
+    if db.engine.dialect.name == 'postgresql': db.session.execute(text('SELECT pg_notify(:channel, NULL)'), {'channel': ORDER_EVENT_CHANNEL})
+def sse_message(event):
+    return f'id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n'
+class OrderEventBroker:
+    # One follower thread per worker process reads new order_event rows once and wakes every /api/events stream in
+    # that process, so the database sees a single LISTEN connection (or one poll per EVENT_POLL_SECONDS) per worker
+    # however many dashboards are open. Ids are allocated before commit, so a lower id can commit after a higher one;
+    # skipped ids are re-checked for a few seconds before being written off as rolled back.
+    GAP_SECONDS = 5
+    def __init__(self, buffer_size=1000):
+        self.condition = threading.Condition()
+        self.messages = deque(maxlen=buffer_size)
+        self.sequence, self.last_id, self.gaps, self.pid, self.pruned, self.streams = 0, 0, {}, None, 0, 0
+    def start(self):
+        # Started by the first subscriber, so under preload_app the thread belongs to the worker, not the master.
+        # Returns the position a new subscriber follows from and the last event id read up to that position.
+        with self.condition:
+            if self.pid != os.getpid():
+                self.pid, self.gaps = os.getpid(), {}
+                self.last_id = db.session.query(func.max(OrderEvent.id)).scalar() or 0
+                threading.Thread(target=self.run, name='order-events', daemon=True).start()
+            return self.sequence, self.last_id
+    def run(self):
+        listener = None
+        while True:
+            try:
+                with app.app_context():
+                    if listener is None and db.engine.dialect.name == 'postgresql': listener = self.listen()
+                    self.fetch()
+                    self.prune()
+                self.wait(listener)
+            except Exception:
+                app.logger.exception('Order event broker failed; retrying.')
+                if listener is not None: listener.invalidate()
+                listener = None
+                time.sleep(app.config['EVENT_POLL_SECONDS'])
+    def listen(self):
+        connection = db.engine.raw_connection()
+        connection.driver_connection.autocommit = True
+        connection.driver_connection.cursor().execute(f'LISTEN {ORDER_EVENT_CHANNEL}')
+        return connection
+    def wait(self, listener):
+        # NOTIFY wakes the thread straight away; the timeout is only a fallback and also lets gaps expire.
+        timeout = app.config['EVENT_POLL_SECONDS'] if listener is None or self.gaps else app.config['EVENT_HEARTBEAT_SECONDS']
+        if listener is None: return time.sleep(timeout)
+        conn = listener.driver_connection
+        if callable(conn.notifies):  # psycopg 3
+            for _ in conn.notifies(timeout=timeout, stop_after=1): pass
+        elif select.select([conn], [], [], timeout)[0]:  # psycopg2
+            conn.poll()
+            conn.notifies.clear()
+    def fetch(self):
+        now = time.time()
+        self.gaps = {event_id: expires for event_id, expires in self.gaps.items() if expires > now}
+        events = OrderEvent.query.filter(or_(OrderEvent.id > self.last_id, OrderEvent.id.in_(list(self.gaps)))).order_by(OrderEvent.id).all()
+        if not events: return
+        with self.condition:
+            for e in events:
+                if e.id > self.last_id:
+                    if e.id - self.last_id <= 100: self.gaps.update(dict.fromkeys(range(self.last_id + 1, e.id), now + self.GAP_SECONDS))
+                    self.last_id = e.id
+                else: self.gaps.pop(e.id, None)
+                self.sequence += 1
+                self.messages.append((self.sequence, e.id, sse_message(e)))
+            self.condition.notify_all()
+    def prune(self):
+        if time.time() - self.pruned < 3600: return
+        OrderEvent.query.filter(OrderEvent.created_at < datetime.utcnow() - timedelta(hours=app.config['EVENT_RETENTION_HOURS'])).delete()
+        db.session.commit()
+        self.pruned = time.time()
+    def replay(self, last_event_id):
+        # Events a reconnecting client missed. Returns None when they are no longer all retained; the client then reloads.
+        events = OrderEvent.query.filter(OrderEvent.id > last_event_id).order_by(OrderEvent.id).limit(app.config['EVENT_REPLAY_LIMIT'] + 1).all()
+        oldest = db.session.query(func.min(OrderEvent.id)).scalar()
+        if len(events) > app.config['EVENT_REPLAY_LIMIT'] or oldest is None or oldest > last_event_id + 1: return None
+        return [(e.id, sse_message(e)) for e in events]
+    def acquire_stream(self):
+        # Under gthread every open stream pins a worker thread, so only EVENT_MAX_STREAMS may be open per worker and the
+        # remaining threads always stay free for ordinary requests.
+        with self.condition:
+            if self.streams >= app.config['EVENT_MAX_STREAMS']: return False
+            self.streams += 1
+            return True
+    def release_stream(self):
+        with self.condition: self.streams -= 1
+    def subscribe(self, cursor, last_id, replayed):
+        # Follows the broker from cursor (taken before the replay was read); events both replayed and buffered go out once.
+        # Streams end after EVENT_STREAM_SECONDS so slots rotate between clients; EventSource reconnects with Last-Event-ID.
+        # The opening frame and every heartbeat carry an id (a frame without data only moves the client's cursor), so a
+        # client that saw no events still reconnects with a position to replay from.
+        sent = {event_id for event_id, _ in replayed}
+        last_id = max([last_id, *(event_id for event_id in sent if event_id)])
+        yield f'id: {last_id}\nretry: 3000\n\n'
+        for _, message in replayed: yield message
+        deadline = time.monotonic() + app.config['EVENT_STREAM_SECONDS']
+        while time.monotonic() < deadline:
+            with self.condition:
+                self.condition.wait_for(lambda: self.sequence > cursor, timeout=app.config['EVENT_HEARTBEAT_SECONDS'])
+                pending = [(event_id, message) for sequence, event_id, message in self.messages if sequence > cursor]
+                cursor, last_id = self.sequence, max(last_id, self.last_id)
+            if not pending: yield f'id: {last_id}\n: keep-alive\n\n'
+            for event_id, message in pending:
+                if event_id not in sent: yield message
+order_event_broker = OrderEventBroker()
+
+# ==============================================================================
+#  CSV IMPORT
+# ==============================================================================
+# products: name, price, description, simple_stock, variant_name, variant_stock (one row per variant; products
+#           without variants use simple_stock and leave variant_name empty). Products are matched on name.
+# customers: name, phone, address. Customers are matched on (name, phone).
+def parse_product_row(row):
+    name = (row.get('name') or '').strip()
+    if not name: raise ValueError('name is required')
+    try: price = float(row.get('price') or '')
+    except ValueError: raise ValueError('price must be a number')
+    variant_name = (row.get('variant_name') or '').strip()
+    stock_field = 'variant_stock' if variant_name else 'simple_stock'
+    try: stock = int(row.get(stock_field) or 0)
+    except ValueError: raise ValueError(f'{stock_field} must be a whole number')
+    return {'name': name, 'price': price, 'description': row.get('description') or None, 'variant_name': variant_name, 'stock': stock}
+def import_product_batch(rows):
+    products, variants = {}, {}
+    for row in rows:
+        product = products.setdefault(row['name'], {'name': row['name'], 'price': row['price'], 'description': row['description'], 'has_variants': False, 'simple_stock': 0})
+        product.update(price=row['price'], description=row['description'])
+        if row['variant_name']:
+            product['has_variants'] = True
+            variants[(row['name'], row['variant_name'])] = row['stock']
+        else:
+            product['simple_stock'] = row['stock']
+    stmt = upsert(Product)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[Product.name], set_={column: stmt.excluded[column] for column in ('price', 'description', 'has_variants', 'simple_stock')}), list(products.values()))
+    product_ids = dict(db.session.query(Product.name, Product.id).filter(Product.name.in_(products)).all())
+    # A product imported without variant rows is a simple product now, so variants from an earlier import go.
+    simple_ids = [product_ids[name] for name, product in products.items() if not product['has_variants']]
+    if simple_ids: ProductVariant.query.filter(ProductVariant.product_id.in_(simple_ids)).delete(synchronize_session=False)
+    existing = {(v.product_id, v.name): v.id for v in ProductVariant.query.filter(ProductVariant.product_id.in_(product_ids.values()))}
+    updates, inserts = [], []
+    for (product_name, variant_name), stock in variants.items():
+        variant_id = existing.get((product_ids[product_name], variant_name))
+        if variant_id: updates.append({'id': variant_id, 'stock': stock})
+        else: inserts.append({'product_id': product_ids[product_name], 'name': variant_name, 'stock': stock})
+    if updates: db.session.execute(update(ProductVariant), updates)
+    if inserts: db.session.execute(insert(ProductVariant), inserts)
+def parse_customer_row(row):
+    name = (row.get('name') or '').strip()
+    if not name: raise ValueError('name is required')
+    return {'name': name, 'phone': (row.get('phone') or '').strip() or None, 'address': (row.get('address') or '').strip() or None}
+def import_customer_batch(rows):
+    customers = {(row['name'], row['phone']): row for row in rows}
+    existing = {(c.name, c.phone): c.id for c in Customer.query.filter(Customer.name.in_({name for name, _ in customers}))}
+    updates = [{'id': existing[key], 'address': row['address']} for key, row in customers.items() if key in existing]
+    inserts = [row for key, row in customers.items() if key not in existing]
+    if updates: db.session.execute(update(Customer), updates)
+    if inserts: db.session.execute(insert(Customer), inserts)
+CSV_IMPORTERS = {'products': (parse_product_row, import_product_batch), 'customers': (parse_customer_row, import_customer_batch)}
+def import_rows(kind, import_batch, rows, errors):
+    # rows are (line, parsed row) pairs. A chunk the database rejects is rolled back and split in half until the
+    # offending rows are isolated, so each is reported with its own line and the rest still import.
+    try:
+        import_batch([row for _, row in rows])
+        bump_versions(kind)
+        db.session.commit()
+        return len(rows)
+    except Exception as e:
+        db.session.rollback()
+        if len(rows) == 1:
+            errors.append({'line': rows[0][0], 'message': str(getattr(e, 'orig', e))})
+            return 0
+        middle = len(rows) // 2
+        return import_rows(kind, import_batch, rows[:middle], errors) + import_rows(kind, import_batch, rows[middle:], errors)
+def import_csv(kind, stream):
+    # Reads the CSV lazily and upserts IMPORT_BATCH_SIZE rows per transaction. Rows that fail to parse or that
+    # the database rejects are reported by line and skipped without stopping the import.
+    parse_row, import_batch = CSV_IMPORTERS[kind]
+    started, total, imported, errors = time.monotonic(), 0, 0, []
+    # line_num counts physical lines, so quoted fields spanning lines keep later rows' numbers right; a row is
+    # reported by the line it ends on.
+    reader = csv.DictReader(stream)
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        batch = list(islice(rows, app.config['IMPORT_BATCH_SIZE']))
+        if not batch: break
+        total += len(batch)
+        parsed = []
+        for line, row in batch:
+            try: parsed.append((line, parse_row(row)))
+            except ValueError as e: errors.append({'line': line, 'message': str(e)})
+        if parsed: imported += import_rows(kind, import_batch, parsed, errors)
+    errors.sort(key=lambda error: error['line'])
+    seconds = time.monotonic() - started
+    return {'rows': total, 'imported': imported, 'errors': errors, 'seconds': round(seconds, 3), 'rows_per_second': round(total / seconds) if seconds else total}
+@app.cli.command('import-csv')
+@click.argument('kind', type=click.Choice(list(CSV_IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_csv_command(kind, path):
+    """Bulk upsert products or customers from a CSV file."""
+    with open(path, newline='', encoding='utf-8-sig') as stream:
+        report = import_csv(kind, stream)
+    for error in report['errors']: click.echo(f"line {error['line']}: {error['message']}", err=True)
+    click.echo(f"Imported {report['imported']} of {report['rows']} rows in {report['seconds']}s ({report['rows_per_second']} rows/s), {len(report['errors'])} errors.")
+
 # ==============================================================================
 #  API ROUTES
 # ==============================================================================
 @app.route('/api/products')
 @login_required
+@conditional_get('products', 'stock')
+@response_cache.cached('products', 'products', 'stock')
 def api_get_products():
     search = request.args.get('search', '').lower()
     query = Product.query
     if search:
         query = query.filter(Product.name.ilike(f'%{search}%'))
-    products_list = query.all()
-    results = []
-    for p in products_list:
-        if p.has_variants:
-            stock = db.session.query(func.sum(ProductVariant.stock)).filter_by(product_id=p.id).scalar() or 0
-        else:
-            stock = p.simple_stock
-        first_image = p.images.first()
-        product_data = {'id': p.id, 'name': p.name, 'price': p.price, 'stock': stock, 'has_variants': p.has_variants, 'thumbnail': first_image.filename if first_image else None}
-        if p.has_variants:
-            product_data['variants'] = [{'id': v.id, 'name': v.name, 'stock': v.stock} for v in p.variants]
-        else:
-            product_data['stock'] = p.simple_stock
-        results.append(product_data)
-    return jsonify({'products': results})
+    after, limit = get_id_cursor(), get_page_limit()
+    if after is not None:
+        query = query.filter(Product.id > after)
+    results = serialize_product_listing(query.order_by(Product.id), limit=limit + 1)
+    next_cursor = str(results[limit - 1]['id']) if len(results) > limit else None
+    return jsonify({'products': results[:limit], 'next_cursor': next_cursor})
+@app.route('/api/products/search')
+@login_required
+@conditional_get('products')
+def api_search_products():
+    term = request.args.get('q', '')
+    if len(term.strip()) < 2: return jsonify({'products': []})
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    return jsonify({'products': product_search_index.search(term, limit)})
 @app.route('/api/product/<int:id>')
 @login_required
 def api_get_product(id):
     p = Product.query.get_or_404(id)
-    return jsonify({'product': {'id': p.id, 'name': p.name, 'price': p.price, 'description': p.description, 'has_variants': p.has_variants, 'simple_stock': p.simple_stock, 'variants': [{'id': v.id, 'name': v.name, 'stock': v.stock} for v in p.variants], 'images': [{'id': i.id, 'filename': i.filename} for i in p.images]}})
+    return jsonify({'product': {'id': p.id, 'name': p.name, 'price': p.price, 'description': p.description, 'has_variants': p.has_variants, 'simple_stock': p.simple_stock, 'variants': [{'id': v.id, 'name': v.name, 'stock': v.stock} for v in p.variants], 'images': [{'id': i.id, 'filename': i.filename, 'url': image_url(i.filename, 'medium')} for i in p.images]}})
 @app.route('/api/product/add', methods=['POST'])
 @login_required
 def api_add_product():
@@ -178,13 +932,8 @@ def api_add_product():
         else:
             new_product.simple_stock = int(data.get('simple_stock', 0))
         db.session.add(new_product)
-        files = request.files.getlist('images')
-        for file in files:
-            if file and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4()}.{ext}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-                new_product.images.append(ProductImage(filename=unique_filename))
+        save_uploaded_images(new_product, request.files.getlist('images'))
+        bump_versions('products')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Product added!'})
     except Exception as e:
@@ -206,13 +955,8 @@ def api_edit_product(id):
                 if name: product.variants.append(ProductVariant(name=name, stock=int(stock)))
         else:
             product.simple_stock = int(data.get('simple_stock', 0))
-        files = request.files.getlist('images')
-        for file in files:
-            if file and allowed_file(file.filename):
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4()}.{ext}"
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_filename))
-                product.images.append(ProductImage(filename=unique_filename))
+        save_uploaded_images(product, request.files.getlist('images'))
+        bump_versions('products')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Product updated!'})
     except Exception as e:
@@ -223,9 +967,10 @@ def api_edit_product(id):
 def api_delete_image(id):
     image = ProductImage.query.get_or_404(id)
     try:
-        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], image.filename))
         db.session.delete(image)
+        bump_versions('products')
         db.session.commit()
+        remove_image_files(image.filename)
         return jsonify({'success': True, 'message': 'Image deleted!'})
     except Exception as e:
         db.session.rollback()
@@ -235,11 +980,11 @@ def api_delete_image(id):
 def api_delete_product(id):
     product = Product.query.get_or_404(id)
     try:
-        for image in product.images:
-            try: os.remove(os.path.join(app.config['UPLOAD_FOLDER'], image.filename))
-            except OSError: pass
+        filenames = [image.filename for image in product.images]
         db.session.delete(product)
+        bump_versions('products')
         db.session.commit()
+        for filename in filenames: remove_image_files(filename)
         return jsonify({'success': True, 'message': 'Product deleted!'})
     except IntegrityError:
         db.session.rollback()
@@ -249,11 +994,16 @@ def api_delete_product(id):
         return jsonify({'success': False, 'message': str(e)}), 500
 @app.route('/api/customers')
 @login_required
+@conditional_get('customers')
 def api_get_customers():
     query = Customer.query
     search = request.args.get('search')
     if search: query = query.filter(Customer.name.ilike(f'%{search}%'))
-    return jsonify({'customers': [{'id': c.id, 'name': c.name, 'phone': c.phone, 'address': c.address} for c in query.all()]})
+    after, limit = get_id_cursor(), get_page_limit()
+    if after is not None: query = query.filter(Customer.id > after)
+    customers_list = query.order_by(Customer.id).limit(limit + 1).all()
+    next_cursor = str(customers_list[limit - 1].id) if len(customers_list) > limit else None
+    return jsonify({'customers': [{'id': c.id, 'name': c.name, 'phone': c.phone, 'address': c.address} for c in customers_list[:limit]], 'next_cursor': next_cursor})
 @app.route('/api/customer/<int:id>')
 @login_required
 def api_get_customer(id):
@@ -267,6 +1017,7 @@ def api_add_customer():
     try:
         new_customer = Customer(name=data['name'], phone=data.get('phone'), address=data.get('address'))
         db.session.add(new_customer)
+        bump_versions('customers')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Customer added!'})
     except Exception as e:
@@ -279,6 +1030,7 @@ def api_edit_customer(id):
     data = request.get_json()
     try:
         customer.name, customer.phone, customer.address = data['name'], data.get('phone'), data.get('address')
+        bump_versions('customers')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Customer updated!'})
     except Exception as e:
@@ -291,6 +1043,7 @@ def api_delete_customer(id):
     if customer.orders: return jsonify({'success': False, 'message': 'Cannot delete customer with existing orders.'}), 400
     try:
         db.session.delete(customer)
+        bump_versions('customers')
         db.session.commit()
         return jsonify({'success': True, 'message': 'Customer deleted!'})
     except Exception as e:
@@ -298,9 +1051,49 @@ def api_delete_customer(id):
         return jsonify({'success': False, 'message': str(e)}), 500
 @app.route('/api/orders')
 @login_required
+@conditional_get('orders', 'customers')
 def api_get_orders():
-    orders_list = CustomerOrder.query.order_by(CustomerOrder.order_date.desc()).all()
-    return jsonify({'orders': [{'id': o.id, 'customer_name': o.customer.name if o.customer else 'N/A', 'date': o.order_date.strftime('%d %b %Y'), 'total_value': f'{o.total_value:.2f}', 'item_count': o.items.count(), 'status': o.status, 'delivery_method': o.delivery_method} for o in orders_list]})
+    query = filtered_orders_query()
+    after, limit = get_order_cursor(), get_page_limit()
+    if after: query = query.filter(tuple_(CustomerOrder.order_date, CustomerOrder.id) < after)
+    orders_list = order_summary_query(query).order_by(CustomerOrder.order_date.desc(), CustomerOrder.id.desc()).limit(limit + 1).all()
+    next_cursor = order_cursor(orders_list[limit - 1]) if len(orders_list) > limit else None
+    return jsonify({'next_cursor': next_cursor, 'orders': [serialize_order_summary(o) for o in orders_list[:limit]]})
+@app.route('/api/orders/export')
+@login_required
+def api_export_orders():
+    # One row per order line, read through a server-side cursor (yield_per) and flushed every EXPORT_CHUNK_SIZE
+    # rows, so memory stays flat however much history is exported.
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'): return jsonify({'success': False, 'message': "'format' must be 'csv' or 'ndjson'."}), 400
+    columns = ['order_id', 'order_date', 'status', 'delivery_method', 'order_total', 'customer_id', 'customer_name', 'customer_phone', 'customer_address', 'item_id', 'product_id', 'product_name', 'variant_id', 'variant_name', 'quantity', 'price_per_item']
+    rows = (filtered_orders_query(reporting_session())
+            .outerjoin(Customer, Customer.id == CustomerOrder.customer_id)
+            .outerjoin(OrderItem, OrderItem.order_id == CustomerOrder.id)
+            .outerjoin(Product, Product.id == OrderItem.product_id)
+            .outerjoin(ProductVariant, ProductVariant.id == OrderItem.variant_id)
+            .with_entities(CustomerOrder.id, CustomerOrder.order_date, CustomerOrder.status, CustomerOrder.delivery_method, CustomerOrder.total_value, Customer.id, Customer.name, Customer.phone, Customer.address, OrderItem.id, Product.id, Product.name, ProductVariant.id, ProductVariant.name, OrderItem.quantity, OrderItem.price_per_item)
+            .order_by(CustomerOrder.order_date, CustomerOrder.id, OrderItem.id)
+            .yield_per(app.config['EXPORT_CHUNK_SIZE']))
+    def generate():
+        # The view's teardown has already run by the time this iterates, so the session is closed here explicitly.
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv': writer.writerow(columns)
+            for count, row in enumerate(rows, 1):
+                values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+                if export_format == 'csv': writer.writerow(values)
+                else: buffer.write(json.dumps(dict(zip(columns, values))) + '\n')
+                if count % app.config['EXPORT_CHUNK_SIZE'] == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally: rows.session.close()
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"orders-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}'})
 @app.route('/api/order/<int:id>')
 @login_required
 def api_get_order(id):
@@ -310,7 +1103,7 @@ def api_get_order(id):
     for item in order.items:
         first_image = item.product.images.first()
         thumbnail = first_image.filename if first_image else None
-        items_data.append({'product_id': item.product_id, 'variant_id': item.variant_id, 'quantity': item.quantity, 'name': f"{item.product.name} ({item.variant.name})" if item.variant else item.product.name, 'price': item.price_per_item, 'thumbnail': thumbnail, 'has_variants': item.product.has_variants, 'variants': [{'id': v.id, 'name': v.name} for v in item.product.variants] if item.product.has_variants else []})
+        items_data.append({'product_id': item.product_id, 'variant_id': item.variant_id, 'quantity': item.quantity, 'name': f"{item.product.name} ({item.variant.name})" if item.variant else item.product.name, 'price': item.price_per_item, 'thumbnail': thumbnail, 'thumbnail_url': image_url(thumbnail, 'thumb'), 'has_variants': item.product.has_variants, 'variants': [{'id': v.id, 'name': v.name} for v in item.product.variants] if item.product.has_variants else []})
     return jsonify({'order': {'id': order.id, 'customer_id': order.customer_id, 'status': order.status, 'delivery_method': order.delivery_method, 'total_value': f'{order.total_value:.2f}', 'date': order.order_date.strftime('%d %b %Y, %I:%M %p'), 'customer_info': {'name': customer.name, 'phone': customer.phone or 'N/A', 'address': customer.address or 'N/A'}, 'items': items_data}})
 @app.route('/api/order/add', methods=['POST'])
 @login_required
@@ -319,18 +1112,60 @@ def api_add_order():
     try:
         customer = Customer.query.get(data['customer_id'])
         if not customer: return jsonify({'success': False, 'message': 'Customer not found.'}), 404
-        new_order = CustomerOrder(customer=customer, total_value=0, status='Not in-process', delivery_method=data.get('delivery_method', 'Delivery'))
-        total_order_value = 0
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            if not product: continue
-            new_item = OrderItem(customer_order=new_order, product_id=product.id, variant_id=item_data.get('variant_id'), quantity=item_data['quantity'], price_per_item=product.price)
-            total_order_value += product.price * item_data['quantity']
-            db.session.add(new_item)
-        new_order.total_value = total_order_value
+        products, variants = load_order_catalog([data])
+        new_order = CustomerOrder(customer=customer, total_value=0, status='Not in-process', delivery_method=data.get('delivery_method', 'Delivery'), stock_reserved=True)
         db.session.add(new_order)
+        stock_moved = adjust_stock(write_order_items(new_order, data['items'], products, variants), products, variants)
+        db.session.flush()
+        record_revenue(new_order.order_date, new_order.total_value, 1)
+        publish_order_events('order-created', order_event_payloads([new_order.id]))
+        bump_versions('orders', *(['stock'] if stock_moved else []))
         db.session.commit()
         return jsonify({'success': True, 'message': 'Order created successfully!'})
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+@app.route('/api/orders/bulk', methods=['POST'])
+@login_required
+def api_add_orders_bulk():
+    # All-or-nothing: any invalid order or stock shortfall rolls back the whole batch. Stock for the whole batch is
+    # taken in one adjust_stock pass, so rows are locked in key order however the orders list them.
+    data = request.get_json()
+    orders_data = data.get('orders') if data else None
+    if not orders_data: return jsonify({'success': False, 'message': "'orders' must be a non-empty list."}), 400
+    try:
+        customers = {c.id: c for c in Customer.query.filter(Customer.id.in_({int(o['customer_id']) for o in orders_data}))}
+        products, variants = load_order_catalog(orders_data)
+        created, revenue, deltas = [], {}, {}
+        for index, order_data in enumerate(orders_data):
+            try:
+                customer = customers.get(int(order_data['customer_id']))
+                if not customer: raise OrderError('Customer not found.')
+                status = order_data.get('status', 'Not in-process')
+                if status not in ORDER_STATUSES: raise OrderError('Invalid status provided.')
+                try: order_date = datetime.fromisoformat(order_data['order_date']) if order_data.get('order_date') else datetime.utcnow()
+                except ValueError: raise OrderError("'order_date' must be an ISO 8601 timestamp.")
+                order = CustomerOrder(customer=customer, order_date=order_date, status=status, delivery_method=order_data.get('delivery_method', 'Delivery'), stock_reserved=True)
+                db.session.add(order)
+                for key, delta in write_order_items(order, order_data['items'], products, variants).items(): deltas[key] = deltas.get(key, 0) + delta
+            except OrderError as e:
+                raise OrderError(f'Order {index + 1}: {e}')
+            created.append(order)
+            value, count = revenue.get(order_date.date(), (0, 0))
+            revenue[order_date.date()] = (value + order.total_value, count + 1)
+        stock_moved = adjust_stock(deltas, products, variants)
+        for day, (value, count) in revenue.items(): record_revenue(datetime.combine(day, datetime.min.time()), value, count)
+        db.session.flush()
+        publish_order_events('order-created', order_event_payloads([o.id for o in created]))
+        bump_versions('orders', *(['stock'] if stock_moved else []))
+        db.session.commit()
+        return jsonify({'success': True, 'message': f'{len(created)} orders created.', 'order_ids': [o.id for o in created]})
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -343,17 +1178,17 @@ def api_edit_order(id):
         order.customer_id = data['customer_id']
         order.status = data['status']
         order.delivery_method = data.get('delivery_method', 'Delivery')
-        order.items.delete()
-        total_order_value = 0
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            if not product: continue
-            new_item = OrderItem(order_id=order.id, product_id=product.id, variant_id=item_data.get('variant_id'), quantity=item_data['quantity'], price_per_item=product.price)
-            total_order_value += product.price * item_data['quantity']
-            db.session.add(new_item)
-        order.total_value = total_order_value
+        previous_total = order.total_value
+        products, variants = load_order_catalog([data])
+        stock_moved = adjust_stock(write_order_items(order, data['items'], products, variants, order.items.all()), products, variants)
+        record_revenue(order.order_date, order.total_value - previous_total)
+        publish_order_events('order-updated', order_event_payloads([order.id]))
+        bump_versions('orders', *(['stock'] if stock_moved else []))
         db.session.commit()
         return jsonify({'success': True, 'message': 'Order updated successfully!'})
+    except OrderError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -363,11 +1198,12 @@ def api_update_order_status(id):
     order = CustomerOrder.query.get_or_404(id)
     data = request.get_json()
     new_status = data.get('status')
-    allowed_statuses = ['Not in-process', 'Processing', 'Completed']
-    if new_status not in allowed_statuses:
+    if new_status not in ORDER_STATUSES:
         return jsonify({'success': False, 'message': 'Invalid status provided.'}), 400
     try:
         order.status = new_status
+        publish_order_events('status-changed', [{'id': order.id, 'status': new_status}])
+        bump_versions('orders')
         db.session.commit()
         return jsonify({'success': True, 'message': f'Order status updated to {new_status}.'})
     except Exception as e:
@@ -378,32 +1214,100 @@ def api_update_order_status(id):
 def api_delete_order(id):
     order = CustomerOrder.query.get_or_404(id)
     try:
+        record_revenue(order.order_date, -order.total_value, -1)
+        stock_moved = adjust_stock(write_order_items(order, [], {}, {}, order.items.all()), {}, {})
         db.session.delete(order)
+        publish_order_events('order-deleted', [{'id': id}])
+        bump_versions('orders', *(['stock'] if stock_moved else []))
         db.session.commit()
         return jsonify({'success': True, 'message': 'Order deleted!'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
+@app.route('/api/events')
+@login_required
+def api_events():
+    # Server-Sent Events feed of order changes. When this worker has no stream slot left the client is told to retry
+    # later (and reloads the list meanwhile), rather than tying up a thread other requests need.
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try: last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError: raise InvalidQueryParam("Invalid 'Last-Event-ID'.")
+    if not order_event_broker.acquire_stream():
+        # The id lets the retry replay whatever happens after the reload the busy event triggers.
+        last_id = db.session.query(func.max(OrderEvent.id)).scalar() or 0
+        return Response(f"id: {last_id}\nretry: {app.config['EVENT_BUSY_RETRY_MS']}\nevent: busy\ndata: {{}}\n\n", mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    response = None
+    try:
+        (cursor, last_id), replayed = order_event_broker.start(), []
+        if last_event_id is not None:
+            replayed = order_event_broker.replay(last_event_id)
+            # Too far behind to replay: the client reloads the list and follows on from there.
+            if replayed is None: replayed = [(None, 'event: reset\ndata: {}\n\n')]
+        response = Response(order_event_broker.subscribe(cursor, last_id, replayed), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.call_on_close(order_event_broker.release_stream)
+        return response
+    finally:
+        # The slot is handed to the response, which frees it when the server closes the stream.
+        if response is None: order_event_broker.release_stream()
 @app.route('/api/revenue-data')
 @login_required
+@conditional_get('orders')
+@response_cache.cached('revenue', 'orders')
 def api_revenue_data():
     today = datetime.utcnow()
+    months = month_starts(today, 12)
+    days = [(today - timedelta(days=i)).date() for i in range(6, -1, -1)]
+    totals = dict(db.session.query(DailyRevenue.day, DailyRevenue.total_value).filter(DailyRevenue.day >= min(months[0].date(), days[0])).all())
     monthly_labels, monthly_data = [], []
-    for i in range(11, -1, -1):
-        target_month_date = today - timedelta(days=i * 30)
-        month_start = target_month_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        next_month_start = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
-        monthly_total = db.session.query(func.sum(CustomerOrder.total_value)).filter(CustomerOrder.order_date >= month_start, CustomerOrder.order_date < next_month_start).scalar() or 0.0
+    for month_start in months:
+        monthly_total = sum(value for day, value in totals.items() if (day.year, day.month) == (month_start.year, month_start.month))
         monthly_labels.append(month_start.strftime('%b %Y'))
         monthly_data.append(round(monthly_total, 2))
-    daily_labels, daily_data = [], []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        daily_total = db.session.query(func.sum(CustomerOrder.total_value)).filter(func.date(CustomerOrder.order_date) == day.date()).scalar() or 0.0
-        daily_labels.append(day.strftime('%a, %d'))
-        daily_data.append(round(daily_total, 2))
+    daily_labels = [day.strftime('%a, %d') for day in days]
+    daily_data = [round(totals.get(day, 0.0), 2) for day in days]
     return jsonify({'monthly': {'labels': monthly_labels, 'data': monthly_data}, 'daily': {'labels': daily_labels, 'data': daily_data}})
 
+@app.route('/api/import/<kind>', methods=['POST'])
+@login_required
+def api_import_csv(kind):
+    if kind not in CSV_IMPORTERS: return jsonify({'success': False, 'message': f"Unknown import type '{kind}'."}), 404
+    file = request.files.get('file')
+    if not file: return jsonify({'success': False, 'message': 'A CSV file is required.'}), 400
+    report = import_csv(kind, io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline=''))
+    return jsonify({'success': True, 'message': f"Imported {report['imported']} of {report['rows']} rows.", **report})
+@app.route('/metrics')
+def metrics():
+    # Fails closed: without a METRICS_TOKEN the endpoint does not exist.
+    if not app.config['METRICS_TOKEN']: return jsonify({'success': False, 'message': 'Not found.'}), 404
+    if request.headers.get('Authorization') != f"Bearer {app.config['METRICS_TOKEN']}":
+        return jsonify({'success': False, 'message': 'Unauthorized.'}), 401
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+@app.route('/api/cache-stats')
+@login_required
+def api_cache_stats():
+    return jsonify(response_cache.stats())
+
+# ==============================================================================
+#  WARMUP
+# ==============================================================================
+WARMUP_ROUTES = ['/', '/api/products', '/api/revenue-data']
+def warm_up():
+    # Run by gunicorn in each worker before it accepts traffic: compiles every template, opens a pooled
+    # connection, builds the product search index and fills the response cache for the busiest read routes.
+    for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')): app.jinja_env.get_template(name)
+    with app.test_request_context():
+        db.session.execute(text('SELECT 1'))
+        product_search_index.ensure_fresh()
+    for path in WARMUP_ROUTES:
+        # View functions are called directly, so warmup requests never reach the request metrics.
+        with app.test_request_context(path):
+            session['logged_in'] = True
+            app.view_functions[request.url_rule.endpoint]()
+
 # ==============================================================================
 #  INITIALIZATION & SERVER START
 # ==============================================================================
@@ -0,0 +1,221 @@
+# ==============================================================================
+#  BENCHMARK.PY - Synthetic data generator and route benchmark runner
+# ==============================================================================
+# Targets whatever DATABASE_URL points at (SQLite or a local Postgres), so never run it against production.
+#
+#   python benchmark.py seed --products 5000 --customers 50000 --order-items 1000000
+#   python benchmark.py run --iterations 50 --output bench-new.json --compare bench-old.json
+#
+# Runs measure uncached responses by default; --response-cache measures with the response cache warm instead.
+import os
+import io
+import csv
+import sys
+import json
+import random
+import argparse
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from app import app, db, Product, ProductVariant, ProductImage, Customer, CustomerOrder, OrderItem, ORDER_STATUSES, response_cache, rebuild_daily_revenue, bump_versions
+
+BATCH_SIZE = 10000
+
+# ==============================================================================
+#  SEED DATA
+# ==============================================================================
+def insert_batches(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+def random_order_date(rng, now, days):
+    # Recent days are busier than old ones and weekends busier than weekdays, so daily/monthly charts look realistic.
+    while True:
+        date = now - timedelta(days=int(days * rng.random() ** 1.5), seconds=rng.randint(0, 86399))
+        if date.weekday() >= 5 or rng.random() < 0.7: return date
+def seed(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    uploads = [f for f in os.listdir(app.config['UPLOAD_FOLDER']) if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], f))]
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        first_product = (db.session.query(db.func.max(Product.id)).scalar() or 0) + 1
+        products = [{'id': first_product + i, 'name': f'Bench Product {first_product + i}', 'description': 'Synthetic benchmark product.', 'price': round(rng.uniform(1, 250), 2), 'has_variants': rng.random() < args.variant_ratio, 'simple_stock': 1000000} for i in range(args.products)]
+        insert_batches(Product, products)
+        variants, images = [], []
+        for p in products:
+            if p['has_variants']:
+                variants += [{'product_id': p['id'], 'name': size, 'stock': 1000000} for size in rng.sample(['XS', 'S', 'M', 'L', 'XL', 'XXL'], rng.randint(2, 5))]
+            if uploads:
+                images += [{'product_id': p['id'], 'filename': rng.choice(uploads)} for _ in range(rng.randint(0, 3))]
+        insert_batches(ProductVariant, variants)
+        insert_batches(ProductImage, images)
+        variants_by_product = {}
+        for v in db.session.query(ProductVariant.id, ProductVariant.product_id).filter(ProductVariant.product_id >= first_product):
+            variants_by_product.setdefault(v.product_id, []).append(v.id)
+        first_customer = (db.session.query(db.func.max(Customer.id)).scalar() or 0) + 1
+        customers = [{'id': first_customer + i, 'name': f'Bench Customer {first_customer + i}', 'phone': f'+973 {rng.randint(30000000, 39999999)}', 'address': f'Block {rng.randint(100, 999)}, Road {rng.randint(1, 9999)}'} for i in range(args.customers)]
+        insert_batches(Customer, customers)
+        next_order = (db.session.query(db.func.max(CustomerOrder.id)).scalar() or 0) + 1
+        remaining = args.order_items
+        while remaining > 0:
+            orders, items = [], []
+            while remaining > 0 and len(items) < BATCH_SIZE:
+                lines = min(remaining, rng.choice([1, 1, 2, 2, 3, 4, 5, 8]))
+                total = 0.0
+                for p in rng.sample(products, min(lines, len(products))):
+                    quantity = rng.randint(1, 4)
+                    variant_id = rng.choice(variants_by_product[p['id']]) if p['has_variants'] else None
+                    items.append({'order_id': next_order, 'product_id': p['id'], 'variant_id': variant_id, 'quantity': quantity, 'price_per_item': p['price']})
+                    total += p['price'] * quantity
+                orders.append({'id': next_order, 'order_date': random_order_date(rng, now, args.days), 'total_value': round(total, 2), 'customer_id': first_customer + rng.randrange(args.customers), 'status': rng.choice(ORDER_STATUSES), 'delivery_method': rng.choice(['Delivery', 'Pickup']), 'stock_reserved': False})
+                next_order += 1
+                remaining -= lines
+            insert_batches(CustomerOrder, orders)
+            insert_batches(OrderItem, items)
+            print(f'  {args.order_items - remaining}/{args.order_items} order items', file=sys.stderr)
+        rebuild_daily_revenue()
+        bump_versions('products', 'customers', 'orders')
+        db.session.commit()
+    print(f'Seeded {len(products)} products, {len(variants)} variants, {len(images)} images, {len(customers)} customers and {args.order_items} order items in {time.perf_counter() - started:.1f}s.')
+
+# ==============================================================================
+#  BENCHMARK RUNNER
+# ==============================================================================
+def csv_file(rows):
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode()
+def sample_ids(rng):
+    with app.app_context():
+        # Seeded choice over a stable id list, so repeated runs against the same data hit the same rows.
+        pick = lambda query: rng.choice([row[0] for row in query.order_by(query.column_descriptions[0]['expr']).limit(1000)] or [None])
+        ids = {'product': pick(db.session.query(Product.id)), 'simple_product': pick(db.session.query(Product.id).filter(Product.has_variants.is_(False))), 'customer': pick(db.session.query(Customer.id)), 'order': pick(db.session.query(CustomerOrder.id))}
+        # Imports re-send existing rows unchanged, so they exercise the upsert path without growing or altering the data.
+        ids['customers_csv'] = csv_file([('name', 'phone', 'address')] + db.session.query(Customer.name, Customer.phone, Customer.address).order_by(Customer.id).limit(200).all())
+        ids['products_csv'] = csv_file([('name', 'price', 'description', 'simple_stock')] + db.session.query(Product.name, Product.price, Product.description, Product.simple_stock).filter(Product.has_variants.is_(False)).order_by(Product.id).limit(200).all())
+        return ids
+def routes(ids, created):
+    # (name, method, url, json body, form body); callables, so write routes can target rows created earlier in the run.
+    today, week_ago = datetime.utcnow().date(), datetime.utcnow().date() - timedelta(days=7)
+    new_order = lambda: {'customer_id': ids['customer'], 'delivery_method': 'Delivery', 'items': [{'product_id': ids['simple_product'], 'quantity': 1}]}
+    new_product = lambda: {'name': f'Bench New Product {random.random()}', 'price': '9.99', 'description': 'Created by the benchmark.', 'has_variants': 'false', 'simple_stock': '10'}
+    upload = lambda kind: lambda: {'file': (io.BytesIO(ids[f'{kind}_csv']), f'{kind}.csv')}
+    return [
+        ('dashboard', 'GET', lambda: '/', None, None),
+        ('products', 'GET', lambda: '/api/products', None, None),
+        ('products_search', 'GET', lambda: '/api/products?search=product 1', None, None),
+        ('products_typeahead', 'GET', lambda: '/api/products/search?q=product 12', None, None),
+        ('product_detail', 'GET', lambda: f"/api/product/{ids['product']}", None, None),
+        ('customers', 'GET', lambda: '/api/customers', None, None),
+        ('customers_search', 'GET', lambda: '/api/customers?search=customer 4', None, None),
+        ('orders', 'GET', lambda: '/api/orders', None, None),
+        ('orders_filtered', 'GET', lambda: f'/api/orders?status=Processing&date_from={week_ago}&date_to={today}', None, None),
+        ('order_detail', 'GET', lambda: f"/api/order/{ids['order']}", None, None),
+        ('revenue', 'GET', lambda: '/api/revenue-data', None, None),
+        ('orders_export_week', 'GET', lambda: f'/api/orders/export?date_from={week_ago}&date_to={today}', None, None),
+        ('customer_add', 'POST', lambda: '/api/customer/add', lambda: {'name': 'Bench Walk-in', 'phone': '+973 30000000'}, None),
+        ('customer_edit', 'POST', lambda: f"/api/customer/{created['customers'][-1]}/edit", lambda: {'name': 'Bench Walk-in', 'phone': '+973 31111111', 'address': 'Edited'}, None),
+        ('customer_delete', 'POST', lambda: f"/api/customer/{created['customers'].pop()}/delete", None, None),
+        ('import_customers', 'POST', lambda: '/api/import/customers', None, upload('customers')),
+        ('import_products', 'POST', lambda: '/api/import/products', None, upload('products')),
+        ('product_add', 'POST', lambda: '/api/product/add', None, new_product),
+        ('product_edit', 'POST', lambda: f"/api/product/{created['products'][-1]}/edit", None, new_product),
+        ('product_delete', 'POST', lambda: f"/api/product/{created['products'].pop()}/delete", None, None),
+        ('order_add', 'POST', lambda: '/api/order/add', new_order, None),
+        ('orders_bulk', 'POST', lambda: '/api/orders/bulk', lambda: {'orders': [new_order() for _ in range(10)]}, None),
+        ('order_edit', 'POST', lambda: f"/api/order/{created['orders'][-1]}/edit", lambda: {**new_order(), 'status': 'Processing', 'items': [{'product_id': ids['simple_product'], 'quantity': random.randint(1, 3)}]}, None),
+        ('order_status', 'POST', lambda: f"/api/order/{created['orders'][-1]}/status", lambda: {'status': random.choice(ORDER_STATUSES)}, None),
+        ('order_delete', 'POST', lambda: f"/api/order/{created['orders'].pop()}/delete", None, None),
+    ]
+def run(args):
+    rng = random.Random(args.seed)
+    ids = sample_ids(rng)
+    if None in ids.values(): sys.exit('The database is empty; run `python benchmark.py seed` first.')
+    client = app.test_client()
+    with client.session_transaction() as s: s['logged_in'] = True
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+        dialect = db.engine.dialect.name
+        counts = {model.__tablename__: db.session.query(model).count() for model in (Product, ProductVariant, Customer, CustomerOrder, OrderItem)}
+    models = {'products': Product, 'customers': Customer, 'orders': CustomerOrder}
+    with app.app_context(): last_ids = {key: db.session.query(db.func.max(model.id)).scalar() or 0 for key, model in models.items()}
+    created = {}
+    def created_since_start(key):
+        with app.app_context(): return [row[0] for row in db.session.query(models[key].id).filter(models[key].id > last_ids[key]).order_by(models[key].id)]
+    def call(method, url, json_body, form_body):
+        if not args.response_cache: response_cache.backend.delete_prefix('')
+        response = client.open(url(), method=method, json=json_body() if json_body else None, data=form_body() if form_body else None)
+        response.get_data()
+        return response
+    results = {}
+    for name, method, url, json_body, form_body in routes(ids, created):
+        if name in ('customer_edit', 'product_edit', 'order_edit'):
+            # Edit and delete routes work on the rows the preceding add routes created, so the seeded data is left as it was.
+            key = name.split('_')[0] + 's'
+            created[key] = created_since_start(key)
+        timings, queries, statuses = [], [], set()
+        for i in range(args.warmup + args.iterations):
+            statements.clear()
+            started = time.perf_counter()
+            response = call(method, url, json_body, form_body)
+            elapsed = time.perf_counter() - started
+            statuses.add(response.status_code)
+            if i >= args.warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(statements))
+        tracemalloc.start()
+        call(method, url, json_body, form_body)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timings.sort()
+        results[name] = {'status': sorted(statuses), 'p50_ms': round(statistics.median(timings), 2), 'p95_ms': round(timings[max(0, int(len(timings) * 0.95 + 0.5) - 1)], 2), 'mean_ms': round(statistics.fmean(timings), 2), 'queries': statistics.median(queries), 'peak_kib': round(peak / 1024, 1)}
+        print(f"{name:20} {'/'.join(map(str, sorted(statuses))):8} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  queries {results[name]['queries']:>5}  peak {results[name]['peak_kib']:9.1f} KiB")
+    # Bulk orders create more rows than the delete route consumes; remove whatever is left (orders first, they
+    # reference the customers and products) through the app, so stock is handed back too.
+    for key in ('orders', 'customers', 'products'):
+        for row_id in created_since_start(key): client.post(f"/api/{key[:-1]}/{row_id}/delete")
+    report = {'meta': {'timestamp': datetime.utcnow().isoformat(), 'dialect': dialect, 'python': platform.python_version(), 'iterations': args.iterations, 'response_cache': args.response_cache, 'rows': counts}, 'routes': results}
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    if args.compare: sys.exit(compare(args.compare, report, args.threshold))
+def compare(path, report, threshold):
+    # A route regresses when its p95 grows by more than `threshold` (relative) or it issues more queries than before.
+    with open(path) as f: baseline = json.load(f)
+    regressions = 0
+    print(f"\nCompared with {path} ({baseline['meta']['timestamp']}):")
+    if baseline['meta'].get('response_cache') != report['meta']['response_cache']: print('Warning: the two runs used different response cache modes.')
+    for name, new in report['routes'].items():
+        old = baseline['routes'].get(name)
+        if not old: continue
+        change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+        regressed = change > threshold or new['queries'] > old['queries']
+        regressions += regressed
+        print(f"{name:20} p95 {old['p95_ms']:8.2f} -> {new['p95_ms']:8.2f} ms ({change:+.0%})  queries {old['queries']} -> {new['queries']}{'  REGRESSION' if regressed else ''}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed synthetic data and benchmark the dashboard routes.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed_parser = commands.add_parser('seed', help='Insert synthetic products, customers and orders.')
+    seed_parser.add_argument('--products', type=int, default=5000)
+    seed_parser.add_argument('--variant-ratio', type=float, default=0.3)
+    seed_parser.add_argument('--customers', type=int, default=50000)
+    seed_parser.add_argument('--order-items', type=int, default=1000000)
+    seed_parser.add_argument('--days', type=int, default=730, help='Spread order dates over this many past days.')
+    seed_parser.add_argument('--seed', type=int, default=1)
+    run_parser = commands.add_parser('run', help='Benchmark every route through the Flask test client.')
+    run_parser.add_argument('--iterations', type=int, default=30)
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--response-cache', action='store_true', help='Keep the response cache between requests (by default it is cleared before each one).')
+    run_parser.add_argument('--output', help='Write results as JSON to this file.')
+    run_parser.add_argument('--compare', help='Previous results JSON; exits 1 on regressions.')
+    run_parser.add_argument('--threshold', type=float, default=0.2)
+    run_parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    seed(args) if args.command == 'seed' else run(args)
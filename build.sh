@@ -4,6 +4,11 @@ set -o errexit
 
 pip install -r requirements.txt
 
-flask db init
-flask db migrate -m "Initial migration."
+# Migrations (including data steps) can outlast the per-statement timeout the web workers use.
+export DB_STATEMENT_TIMEOUT_MS=0
+# Databases created before this migration history was committed record a revision it does not contain. Their schema
+# is the initial migration's, so re-stamp them there and let upgrade apply everything since.
+if flask db current 2>&1 | grep -q "Can't locate revision"; then
+    flask db stamp --purge 0ea367660ed1
+fi
 flask db upgrade
\ No newline at end of file
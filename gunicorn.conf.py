@@ -0,0 +1,60 @@
+# ==============================================================================
+#  GUNICORN SETTINGS - start with `gunicorn -c gunicorn.conf.py app:app`
+# ==============================================================================
+# Every value can be overridden through the environment (see redner.yaml).
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+# gthread (default) serves GUNICORN_THREADS requests per worker; gevent serves GUNICORN_WORKER_CONNECTIONS greenlets.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+# The app is imported once in the master and forked; post_fork discards any connections made before the fork.
+# gevent workers monkey-patch the standard library only after the fork, and a preloaded app would keep the native
+# threading locks it created earlier (and block the whole worker on them), so they always import the app themselves.
+preload_app = worker_class != 'gevent' and os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+accesslog = '-'
+
+# These are read by app.py, so they have to be set before the app is imported.
+# Size the pool to the requests a worker can serve at once, so threads never queue for a connection.
+os.environ.setdefault('DB_POOL_SIZE', str(threads if worker_class == 'gthread' else 10))
+# Each open /api/events stream pins a gthread thread, so at most half of a worker's threads serve streams; clients
+# beyond that are told to retry later and fall back to reloading the list.
+os.environ.setdefault('EVENT_MAX_STREAMS', str(threads // 2 if worker_class == 'gthread' else worker_connections // 2))
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'azhar-dash-metrics'))
+
+def on_starting(server):
+    # Samples left by a previous run would be summed into /metrics, so start from an empty directory.
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+def post_fork(server, worker):
+    # Without preload nothing has been imported yet, and importing the app here would be too early for gevent.
+    if not preload_app: return
+    from app import app, db
+    with app.app_context():
+        # close=False leaves the parent's sockets alone and just forgets them, so this worker opens its own.
+        for engine in db.engines.values(): engine.dispose(close=False)
+
+def post_worker_init(worker):
+    if worker_class == 'gevent':
+        # Runs after gevent has patched the worker; makes psycopg2's waits yield to other greenlets.
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    if os.environ.get('GUNICORN_WARMUP', '1') != '1': return
+    from app import app, warm_up
+    try: warm_up()
+    except Exception: app.logger.exception('Worker warmup failed; continuing without it.')
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,32 @@
+"""Backfill the daily revenue rollup.
+
+Revision ID: c4f1a9e27d63
+Revises: 6b6e75ceffe3
+Create Date: 2026-10-18 02:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f1a9e27d63'
+down_revision = '6b6e75ceffe3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One-time fill from existing orders; the order write routes keep the rollup current from here on.
+    # A rollup that already has rows (from an earlier `flask backfill-revenue`) is left as it is.
+    bind = op.get_bind()
+    if bind.execute(sa.text('SELECT COUNT(*) FROM daily_revenue')).scalar():
+        return
+    op.execute(
+        'INSERT INTO daily_revenue (day, total_value, order_count) '
+        'SELECT date(order_date), SUM(total_value), COUNT(id) FROM customer_order GROUP BY date(order_date)'
+    )
+
+
+def downgrade():
+    pass
@@ -15,7 +15,8 @@ document.addEventListener('DOMContentLoaded', function () {
         try {
             const isFormData = options.body instanceof FormData;
             if (!isFormData && options.body) { options.headers = { 'Content-Type': 'application/json', ...options.headers }; options.body = JSON.stringify(options.body); }
-            const response = await fetch(url, options);
+            // Read routes send ETags with 'no-cache', so the browser revalidates its cached copy and reuses it on a 304.
+            const response = await fetch(url, { cache: 'no-cache', ...options });
             if (!response.ok) {
                 let errorData;
                 try { errorData = await response.json(); } catch (e) { throw new Error(response.statusText); }
@@ -25,6 +26,7 @@ document.addEventListener('DOMContentLoaded', function () {
             if (contentType && contentType.indexOf("application/json") !== -1) { return await response.json(); }
             return { success: true };
         } catch (error) {
+            if (error.name === 'AbortError') return null;
             console.error('API Error:', error);
             alert(`Error: ${error.message}`);
             return null;
@@ -38,6 +40,47 @@ document.addEventListener('DOMContentLoaded', function () {
         modalBody.innerHTML = await response.text();
         if (setupFunction) await setupFunction();
     }
+    // Typeahead lookup: debounces keystrokes and aborts the in-flight request when a newer term supersedes it.
+    function attachTypeahead(input, resultsList, buildUrl, renderResults) {
+        let timer = null, controller = null;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            if (controller) controller.abort();
+            const term = input.value.trim();
+            if (term.length < 2) { resultsList.innerHTML = ''; return; }
+            timer = setTimeout(async () => {
+                controller = new AbortController();
+                const result = await fetchAPI(buildUrl(term), { signal: controller.signal });
+                if (!result) return;
+                resultsList.innerHTML = '';
+                renderResults(result);
+            }, 200);
+        });
+    }
+    // Keyset-paginated table loader: fetches one page at a time and appends the next page when the sentinel below the table scrolls into view.
+    function createPager({ url, key, tableBody, renderRow, emptyRow }) {
+        const sentinel = document.createElement('div');
+        tableBody.closest('.table-responsive').after(sentinel);
+        let params = {}, nextCursor = null, loading = false, generation = 0;
+        const sentinelVisible = () => sentinel.getBoundingClientRect().top < window.innerHeight;
+        async function loadPage(reset = false) {
+            if (!reset && (loading || !nextCursor)) return;
+            const currentGeneration = reset ? ++generation : generation;
+            loading = true;
+            const query = new URLSearchParams(Object.entries(params).filter(([, value]) => value));
+            if (!reset) query.set('after', nextCursor);
+            const result = await fetchAPI(`${url}?${query}`);
+            if (currentGeneration !== generation) return;
+            loading = false;
+            if (!result) return;
+            if (reset) tableBody.innerHTML = result[key].length === 0 ? emptyRow : '';
+            result[key].forEach(item => tableBody.insertAdjacentHTML('beforeend', renderRow(item)));
+            nextCursor = result.next_cursor;
+            if (nextCursor && sentinelVisible()) loadPage();
+        }
+        new IntersectionObserver(entries => { if (entries[0].isIntersecting) loadPage(); }).observe(sentinel);
+        return { reload(newParams = params) { params = newParams; nextCursor = null; return loadPage(true); }, hasMore: () => nextCursor !== null };
+    }
     function getStatusClass(status) {
         if (status === 'Completed') return 'bg-success';
         if (status === 'Processing') return 'bg-warning text-dark';
@@ -49,20 +92,14 @@ document.addEventListener('DOMContentLoaded', function () {
     if (productPage) {
         const productTableBody = document.getElementById('product-table-body');
         const addProductBtn = document.getElementById('addProductBtn');
-        function renderProducts(products) {
-            productTableBody.innerHTML = '';
-            if (products.length === 0) { productTableBody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">No products found.</td></tr>'; return; }
-            products.forEach(p => {
-                const thumbnail = p.thumbnail ? `<img src="/static/uploads/${p.thumbnail}" class="img-thumbnail" style="width: 50px; height: 50px; object-fit: cover;">` : '<div class="img-thumbnail" style="width: 50px; height: 50px; background-color: #f8f9fa;"></div>';
-                const stockInfo = p.has_variants ? `<span class="badge bg-primary">Variants</span>` : `<span class="badge bg-secondary">${p.stock}</span>`;
-                const row = `<tr><td class="d-flex align-items-center">${thumbnail}<strong class="ms-3">${p.name}</strong></td><td>$${p.price.toFixed(2)}</td><td>${stockInfo}</td><td class="text-end"><button class="btn btn-sm btn-secondary edit-product-btn" data-id="${p.id}">Edit</button><button class="btn btn-sm btn-danger delete-product-btn" data-id="${p.id}">Delete</button></td></tr>`;
-                productTableBody.insertAdjacentHTML('beforeend', row);
-            });
-        }
-        async function loadProducts() {
-            const result = await fetchAPI('/api/products');
-            if (result) renderProducts(result.products);
+        const productSearchInput = document.getElementById('productSearchInput');
+        function renderProductRow(p) {
+            const thumbnail = p.thumbnail_url ? `<img src="${p.thumbnail_url}" loading="lazy" class="img-thumbnail" style="width: 50px; height: 50px; object-fit: cover;">` : '<div class="img-thumbnail" style="width: 50px; height: 50px; background-color: #f8f9fa;"></div>';
+            const stockInfo = p.has_variants ? `<span class="badge bg-primary">Variants</span>` : `<span class="badge bg-secondary">${p.stock}</span>`;
+            return `<tr><td class="d-flex align-items-center">${thumbnail}<strong class="ms-3">${p.name}</strong></td><td>$${p.price.toFixed(2)}</td><td>${stockInfo}</td><td class="text-end"><button class="btn btn-sm btn-secondary edit-product-btn" data-id="${p.id}">Edit</button><button class="btn btn-sm btn-danger delete-product-btn" data-id="${p.id}">Delete</button></td></tr>`;
         }
+        const productPager = createPager({ url: '/api/products', key: 'products', tableBody: productTableBody, renderRow: renderProductRow, emptyRow: '<tr><td colspan="4" class="text-center text-muted">No products found.</td></tr>' });
+        const loadProducts = () => productPager.reload({ search: productSearchInput.value });
         function setupProductFormLogic() {
             const hasVariantsSwitch = document.getElementById('hasVariants');
             const simpleStockContainer = document.getElementById('simpleStockContainer');
@@ -123,7 +160,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     const existingImagesContainer = document.getElementById('existingImages');
                     existingImagesContainer.innerHTML = '';
                     product.images.forEach(img => {
-                        existingImagesContainer.innerHTML += `<div class="col-auto" id="image-${img.id}"><div class="card"><img src="/static/uploads/${img.filename}" class="card-img-top" style="width: 100px; height: 100px; object-fit: cover;"><div class="card-body p-1 text-center"><button type="button" class="btn btn-tiny btn-danger delete-image-btn" data-id="${img.id}">&times;</button></div></div></div>`;
+                        existingImagesContainer.innerHTML += `<div class="col-auto" id="image-${img.id}"><div class="card"><img src="${img.url}" class="card-img-top" style="width: 100px; height: 100px; object-fit: cover;"><div class="card-body p-1 text-center"><button type="button" class="btn btn-tiny btn-danger delete-image-btn" data-id="${img.id}">&times;</button></div></div></div>`;
                     });
                     modalSaveButton.classList.remove('d-none');
                     currentSaveHandler = async () => {
@@ -150,6 +187,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 }
             }
         });
+        productSearchInput.addEventListener('input', loadProducts);
         loadProducts();
     }
     const customerPage = document.getElementById('customer-table-body');
@@ -157,22 +195,11 @@ document.addEventListener('DOMContentLoaded', function () {
         const customerTableBody = document.getElementById('customer-table-body');
         const addCustomerBtn = document.getElementById('addCustomerBtn');
         const customerSearchInput = document.getElementById('customerSearchInput');
-        function renderCustomers(customers) {
-            customerTableBody.innerHTML = '';
-            if (customers.length === 0) {
-                customerTableBody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">No customers found.</td></tr>';
-                return;
-            }
-            customers.forEach(c => {
-                const row = `<tr><td><strong>${c.name}</strong></td><td>${c.phone || 'N/A'}</td><td>${c.address || 'N/A'}</td><td class="text-end"><button class="btn btn-sm btn-secondary edit-customer-btn" data-id="${c.id}">Edit</button><button class="btn btn-sm btn-danger delete-customer-btn" data-id="${c.id}">Delete</button></td></tr>`;
-                customerTableBody.insertAdjacentHTML('beforeend', row);
-            });
-        }
-        async function loadCustomers(searchTerm = '') {
-            const url = searchTerm ? `/api/customers?search=${searchTerm}` : '/api/customers';
-            const result = await fetchAPI(url);
-            if (result) renderCustomers(result.customers);
+        function renderCustomerRow(c) {
+            return `<tr><td><strong>${c.name}</strong></td><td>${c.phone || 'N/A'}</td><td>${c.address || 'N/A'}</td><td class="text-end"><button class="btn btn-sm btn-secondary edit-customer-btn" data-id="${c.id}">Edit</button><button class="btn btn-sm btn-danger delete-customer-btn" data-id="${c.id}">Delete</button></td></tr>`;
         }
+        const customerPager = createPager({ url: '/api/customers', key: 'customers', tableBody: customerTableBody, renderRow: renderCustomerRow, emptyRow: '<tr><td colspan="4" class="text-center text-muted">No customers found.</td></tr>' });
+        const loadCustomers = () => customerPager.reload({ search: customerSearchInput.value });
         addCustomerBtn.addEventListener('click', () => {
             showModal('Add New Customer', '/ui/customer-form', () => {
                 modalSaveButton.classList.remove('d-none');
@@ -210,7 +237,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 }
             }
         });
-        customerSearchInput.addEventListener('input', () => loadCustomers(customerSearchInput.value));
+        customerSearchInput.addEventListener('input', loadCustomers);
         loadCustomers();
     }
     
@@ -221,29 +248,63 @@ document.addEventListener('DOMContentLoaded', function () {
     if (orderPage) {
         const orderTableBody = document.getElementById('order-table-body');
         const addOrderBtn = document.getElementById('addOrderBtn');
-        function renderOrders(orders) {
-            orderTableBody.innerHTML = '';
-            if (orders.length === 0) {
-                orderTableBody.innerHTML = '<tr><td colspan="7" class="text-center text-muted">No orders found.</td></tr>'; return;
-            }
-            orders.forEach(o => {
-                const statuses = ['Not in-process', 'Processing', 'Completed'];
-                const options = statuses.map(s => `<option value="${s}" ${s === o.status ? 'selected' : ''}>${s}</option>`).join('');
-                const statusSelector = `<select class="form-select form-select-sm status-change-select ${getStatusClass(o.status).replace('bg-', 'badge-')}" data-id="${o.id}">${options}</select>`;
-                
-                // --- NEW: Create the fulfillment badge ---
-                const fulfillmentBadge = o.delivery_method === 'Pickup' 
-                    ? `<span class="badge bg-info text-dark">Pickup</span>` 
-                    : `<span class="badge bg-light text-dark">Delivery</span>`;
+        const orderFilters = document.getElementById('orderFilters');
+        function renderOrderRow(o) {
+            const statuses = ['Not in-process', 'Processing', 'Completed'];
+            const options = statuses.map(s => `<option value="${s}" ${s === o.status ? 'selected' : ''}>${s}</option>`).join('');
+            const statusSelector = `<select class="form-select form-select-sm status-change-select ${getStatusClass(o.status).replace('bg-', 'badge-')}" data-id="${o.id}">${options}</select>`;
+            
+            // --- NEW: Create the fulfillment badge ---
+            const fulfillmentBadge = o.delivery_method === 'Pickup' 
+                ? `<span class="badge bg-info text-dark">Pickup</span>` 
+                : `<span class="badge bg-light text-dark">Delivery</span>`;
 
-                const row = `<tr><td><strong>#${o.id}</strong></td><td>${o.customer_name}</td><td>${o.date}</td><td>$${o.total_value}</td><td>${fulfillmentBadge}</td><td>${statusSelector}</td><td class="text-end"><button class="btn btn-sm btn-info view-order-btn" data-id="${o.id}">View</button> <button class="btn btn-sm btn-secondary edit-order-btn" data-id="${o.id}">Edit</button> <button class="btn btn-sm btn-danger delete-order-btn" data-id="${o.id}">Delete</button></td></tr>`;
-                orderTableBody.insertAdjacentHTML('beforeend', row);
-            });
+            return `<tr data-order-id="${o.id}" data-order-date="${o.order_date}"><td><strong>#${o.id}</strong></td><td>${o.customer_name}</td><td>${o.date}</td><td>$${o.total_value}</td><td>${fulfillmentBadge}</td><td>${statusSelector}</td><td class="text-end"><button class="btn btn-sm btn-info view-order-btn" data-id="${o.id}">View</button> <button class="btn btn-sm btn-secondary edit-order-btn" data-id="${o.id}">Edit</button> <button class="btn btn-sm btn-danger delete-order-btn" data-id="${o.id}">Delete</button></td></tr>`;
+        }
+        const orderPager = createPager({ url: '/api/orders', key: 'orders', tableBody: orderTableBody, renderRow: renderOrderRow, emptyRow: '<tr><td colspan="7" class="text-center text-muted">No orders found.</td></tr>' });
+        const loadOrders = () => orderPager.reload(Object.fromEntries(new FormData(orderFilters)));
+
+        // Live updates: every create, edit, status change and delete (ours or another staff member's) arrives on
+        // /api/events and patches just that row. EventSource reconnects on its own and resumes from the last event id.
+        const orderEvents = new EventSource('/api/events');
+        const refreshOrders = () => { if (orderEvents.readyState !== EventSource.OPEN) loadOrders(); };
+        const findOrderRow = id => orderTableBody.querySelector(`tr[data-order-id="${id}"]`);
+        function orderMatchesFilters(o) {
+            const filters = Object.fromEntries(new FormData(orderFilters));
+            const day = o.order_date.slice(0, 10);
+            return (!filters.status || filters.status === o.status) && (!filters.delivery_method || filters.delivery_method === o.delivery_method) && (!filters.date_from || day >= filters.date_from) && (!filters.date_to || day <= filters.date_to);
         }
-        async function loadOrders() {
-            const result = await fetchAPI('/api/orders');
-            if (result) renderOrders(result.orders);
+        function putOrderRow(o) {
+            findOrderRow(o.id)?.remove();
+            if (!orderMatchesFilters(o)) return;
+            // Rows are sorted newest first; an order older than everything loaded so far arrives with a later page.
+            const before = [...orderTableBody.querySelectorAll('tr[data-order-id]')].find(row => row.dataset.orderDate < o.order_date || (row.dataset.orderDate === o.order_date && Number(row.dataset.orderId) < o.id));
+            if (before) before.insertAdjacentHTML('beforebegin', renderOrderRow(o));
+            else if (!orderPager.hasMore()) {
+                orderTableBody.querySelectorAll('tr:not([data-order-id])').forEach(row => row.remove());
+                orderTableBody.insertAdjacentHTML('beforeend', renderOrderRow(o));
+            }
         }
+        orderEvents.addEventListener('order-created', e => putOrderRow(JSON.parse(e.data)));
+        orderEvents.addEventListener('order-updated', e => putOrderRow(JSON.parse(e.data)));
+        orderEvents.addEventListener('status-changed', e => {
+            const { id, status } = JSON.parse(e.data);
+            const row = findOrderRow(id);
+            if (!row) return;
+            const filterStatus = new FormData(orderFilters).get('status');
+            if (filterStatus && filterStatus !== status) { row.remove(); return; }
+            const select = row.querySelector('.status-change-select');
+            select.value = status;
+            select.className = `form-select form-select-sm status-change-select ${getStatusClass(status).replace('bg-', 'badge-')}`;
+        });
+        orderEvents.addEventListener('order-deleted', e => findOrderRow(JSON.parse(e.data).id)?.remove());
+        orderEvents.addEventListener('reset', loadOrders);
+        // Every stream slot on this worker is taken: the browser retries later, so catch up with a plain reload meanwhile.
+        orderEvents.addEventListener('busy', loadOrders);
+        // Any reconnect (a dropped connection, a rotated stream, the retry after 'busy') may have missed events that
+        // were not replayed, so the list is reloaded from scratch; the first open follows the initial load.
+        let orderEventsOpened = false;
+        orderEvents.addEventListener('open', () => { if (orderEventsOpened) loadOrders(); orderEventsOpened = true; });
         function setupOrderForm(orderData = null) {
             let selectedItems = orderData ? [...orderData.items] : [];
             const renderOrderItems = () => {
@@ -267,7 +328,9 @@ document.addEventListener('DOMContentLoaded', function () {
                 }
                 document.getElementById('orderTotal').textContent = `$${total.toFixed(2)}`;
             };
-            const customerSelect = document.getElementById('orderCustomer');
+            const customerInput = document.getElementById('orderCustomer');
+            const customerSearch = document.getElementById('customerSearch');
+            const customerResults = document.getElementById('customerSearchResults');
             const productSearch = document.getElementById('productSearch');
             const searchResults = document.getElementById('productSearchResults');
             const itemsBody = document.getElementById('orderItemsTableBody');
@@ -275,28 +338,41 @@ document.addEventListener('DOMContentLoaded', function () {
                 document.getElementById('status-section').classList.remove('d-none');
                 document.getElementById('orderStatus').value = orderData.status;
                 document.querySelector(`input[name="delivery_method"][value="${orderData.delivery_method}"]`).checked = true;
+                customerInput.value = orderData.customer_id;
+                customerSearch.value = orderData.customer_info.name;
             }
-            fetchAPI('/api/customers').then(result => {
-                if (result) {
-                    result.customers.forEach(c => customerSelect.innerHTML += `<option value="${c.id}">${c.name}</option>`);
-                    if (orderData) customerSelect.value = orderData.customer_id;
-                }
+            // Customers are looked up by name as the user types; the customer list is never loaded in full.
+            attachTypeahead(customerSearch, customerResults, term => `/api/customers?${new URLSearchParams({ search: term, limit: 10 })}`, result => {
+                result.customers.forEach(c => {
+                    const customerElement = document.createElement('a');
+                    customerElement.href = '#';
+                    customerElement.className = 'list-group-item list-group-item-action choose-customer';
+                    customerElement.innerHTML = `<strong>${c.name}</strong>${c.phone ? ` <span class="text-muted">${c.phone}</span>` : ''}`;
+                    customerElement.dataset.id = c.id;
+                    customerElement.dataset.name = c.name;
+                    customerResults.appendChild(customerElement);
+                });
             });
-            productSearch.addEventListener('input', async () => {
-                const term = productSearch.value;
-                if (term.length < 2) { searchResults.innerHTML = ''; return; }
-                const result = await fetchAPI(`/api/products?search=${term}`);
-                searchResults.innerHTML = '';
-                if (result) {
-                    result.products.forEach(p => {
-                        const productElement = document.createElement('a');
-                        productElement.href = '#';
-                        productElement.className = 'list-group-item list-group-item-action add-product-to-order';
-                        productElement.innerHTML = `<strong>${p.name}</strong> - $${p.price.toFixed(2)}`;
-                        productElement.dataset.product = JSON.stringify(p);
-                        searchResults.appendChild(productElement);
-                    });
-                }
+            // Editing the name after picking a customer clears the pick until another one is chosen.
+            customerSearch.addEventListener('input', () => { customerInput.value = ''; });
+            customerResults.addEventListener('click', e => {
+                e.preventDefault();
+                const target = e.target.closest('.choose-customer');
+                if (!target) return;
+                customerInput.value = target.dataset.id;
+                customerSearch.value = target.dataset.name;
+                customerResults.innerHTML = '';
+            });
+            attachTypeahead(productSearch, searchResults, term => `/api/products/search?q=${encodeURIComponent(term)}`, result => {
+                result.products.forEach(p => {
+                    const productElement = document.createElement('a');
+                    productElement.href = '#';
+                    productElement.className = 'list-group-item list-group-item-action d-flex align-items-center add-product-to-order';
+                    const thumbnail = p.thumbnail_url ? `<img src="${p.thumbnail_url}" class="me-2" style="width: 24px; height: 24px; object-fit: cover;">` : '';
+                    productElement.innerHTML = `${thumbnail}<span><strong>${p.name}</strong> - $${p.price.toFixed(2)}</span>`;
+                    productElement.dataset.product = JSON.stringify(p);
+                    searchResults.appendChild(productElement);
+                });
             });
             searchResults.addEventListener('click', e => {
                 e.preventDefault();
@@ -332,7 +408,7 @@ document.addEventListener('DOMContentLoaded', function () {
             renderOrderItems();
             currentSaveHandler = async () => {
                 const payload = {
-                    customer_id: customerSelect.value,
+                    customer_id: customerInput.value,
                     status: orderData ? document.getElementById('orderStatus').value : 'Not in-process',
                     delivery_method: document.querySelector('input[name="delivery_method"]:checked').value,
                     items: selectedItems.map(item => ({ product_id: item.product_id, variant_id: item.variant_id || null, quantity: item.quantity }))
@@ -341,7 +417,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     alert('Please select a customer and add at least one product.'); return;
                 }
                 const result = orderData ? await fetchAPI(`/api/order/${orderData.id}/edit`, { method: 'POST', body: payload }) : await fetchAPI('/api/order/add', { method: 'POST', body: payload });
-                if (result) { mainModal.hide(); loadOrders(); }
+                if (result) { mainModal.hide(); refreshOrders(); }
             };
         }
         addOrderBtn.addEventListener('click', () => {
@@ -361,7 +437,7 @@ document.addEventListener('DOMContentLoaded', function () {
             if (target.classList.contains('delete-order-btn')) {
                 if (confirm('Are you sure you want to delete this order?')) {
                     const result = await fetchAPI(`/api/order/${id}/delete`, { method: 'POST' });
-                    if (result) loadOrders();
+                    if (result) refreshOrders();
                 }
             }
             if (target.classList.contains('view-order-btn')) {
@@ -383,7 +459,7 @@ document.addEventListener('DOMContentLoaded', function () {
                         const itemsBody = document.getElementById('viewOrderItems');
                         itemsBody.innerHTML = '';
                         order.items.forEach(item => {
-                            const thumbnail = item.thumbnail ? `<img src="/static/uploads/${item.thumbnail}" class="img-thumbnail" style="width: 50px; height: 50px; object-fit: cover;">` : '<div class="img-thumbnail" style="width: 50px; height: 50px; background-color: #f8f9fa;"></div>';
+                            const thumbnail = item.thumbnail_url ? `<img src="${item.thumbnail_url}" class="img-thumbnail" style="width: 50px; height: 50px; object-fit: cover;">` : '<div class="img-thumbnail" style="width: 50px; height: 50px; background-color: #f8f9fa;"></div>';
                             itemsBody.innerHTML += `<tr><td>${thumbnail}</td><td>${item.name}</td><td>${item.quantity}</td><td class="text-end">$${item.price.toFixed(2)}</td><td class="text-end">$${(item.price * item.quantity).toFixed(2)}</td></tr>`;
                         });
                         document.getElementById('viewOrderTotal').textContent = `$${order.total_value}`;
@@ -406,6 +482,11 @@ document.addEventListener('DOMContentLoaded', function () {
                 }
             }
         });
+        orderFilters.addEventListener('change', loadOrders);
+        document.getElementById('exportOrdersBtn').addEventListener('click', () => {
+            const filters = Object.entries(Object.fromEntries(new FormData(orderFilters))).filter(([, value]) => value);
+            window.location = `/api/orders/export?${new URLSearchParams([['format', 'csv'], ...filters])}`;
+        });
         loadOrders();
     }
 
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+
+# app.py reads its configuration at import time, so the test database has to be chosen first. TEST_DATABASE_URL runs
+# the suite against a scratch Postgres database instead; every test drops and recreates its tables.
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import pytest
+from flask import g
+from sqlalchemy import event
+from app import app as flask_app, db, response_cache, product_search_index, order_event_broker, MemoryCacheBackend, Product, ProductVariant, Customer, CustomerOrder, OrderItem
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    # Cache keys and the search index are keyed on resource versions, which restart at zero with every fresh schema.
+    response_cache.backend = MemoryCacheBackend(flask_app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+    product_search_index.version = None
+    order_event_broker.last_id, order_event_broker.gaps = 0, {}
+    with flask_app.app_context():
+        # Reset at setup rather than dropped at teardown, so the order event broker thread never polls a missing table.
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return logged_in_client(app)
+
+
+def logged_in_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['logged_in'] = True
+    return client
+
+
+def make_product(name='Widget', price=10.0, stock=5, variants=None):
+    product = Product(name=name, price=price, has_variants=bool(variants), simple_stock=0 if variants else stock)
+    for variant_name, variant_stock in (variants or {}).items():
+        product.variants.append(ProductVariant(name=variant_name, stock=variant_stock))
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def make_customer(name='Customer'):
+    customer = Customer(name=name)
+    db.session.add(customer)
+    db.session.commit()
+    return customer
+
+
+def make_orders(count, customer, product):
+    for _ in range(count):
+        order = CustomerOrder(customer=customer, total_value=product.price, status='Not in-process', stock_reserved=False)
+        db.session.add(order)
+        db.session.add(OrderItem(customer_order=order, product_id=product.id, quantity=1, price_per_item=product.price))
+    db.session.commit()
+
+
+def captured_statements(client, url):
+    # Every (statement, parameters) pair a GET issues. Requests share the fixture's app context, so the per-request
+    # resource version memo is dropped first to capture its lookup every time.
+    g.pop('resource_versions', None)
+    # Only this thread's statements count; background threads such as the order event broker share the engine.
+    statements, thread = [], threading.get_ident()
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread: statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try: assert client.get(url).status_code == 200
+    finally: event.remove(db.engine, 'before_cursor_execute', listener)
+    return statements
@@ -0,0 +1,46 @@
+from app import order_event_broker
+from conftest import make_customer, make_product
+
+
+def open_stream(client):
+    response = client.get('/api/events', buffered=False)
+    assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+    return response
+
+
+def test_streams_are_capped_per_worker(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'EVENT_MAX_STREAMS', 1)
+    first = open_stream(client)
+    assert next(first.response) == b'id: 0\nretry: 3000\n\n'
+
+    busy = open_stream(client)
+    assert busy.get_data().startswith(b'id: 0\n') and b'event: busy' in busy.get_data()
+
+    first.close()
+    assert order_event_broker.streams == 0
+    second = open_stream(client)
+    assert next(second.response) == b'id: 0\nretry: 3000\n\n'
+    second.close()
+
+
+def test_order_writes_reach_the_stream(client):
+    product, customer = make_product(stock=5), make_customer()
+    stream = open_stream(client)
+    next(stream.response)
+    assert client.post('/api/order/add', json={'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 1}]}).status_code == 200
+    message = next(message for message in stream.response if b'keep-alive' not in message)
+    assert b'event: order-created' in message
+    stream.close()
+
+
+def test_streams_open_and_heartbeat_with_the_latest_id(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'EVENT_HEARTBEAT_SECONDS', 0.05)
+    product, customer = make_product(stock=5), make_customer()
+    assert client.post('/api/order/add', json={'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': 1}]}).status_code == 200
+    order_event_broker.start()
+    order_event_broker.fetch()
+    stream = open_stream(client)
+    assert next(stream.response) == b'id: 1\nretry: 3000\n\n'
+    heartbeat = next(message for message in stream.response if b'keep-alive' in message)
+    assert heartbeat.startswith(b'id: 1\n')
+    stream.close()
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+from PIL import Image
+
+import app as app_module
+
+
+@pytest.fixture
+def upload_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app.config, 'IMAGE_VARIANT_FOLDER', str(tmp_path / 'variants'))
+    monkeypatch.setattr(app_module, 'image_jobs_pending', set())
+    monkeypatch.setattr(app_module, 'image_jobs_failed', set())
+    return tmp_path
+
+
+def test_missing_variant_is_queued_once(client, upload_folder, monkeypatch):
+    Image.new('RGB', (800, 600), 'red').save(upload_folder / 'photo.jpg')
+    submitted = []
+    monkeypatch.setattr(app_module.image_executor, 'submit', lambda fn, *args: submitted.append(args))
+    for _ in range(5): assert client.get('/media/thumb/photo.jpg').status_code == 200
+    assert submitted == [('photo.jpg',)]
+
+    app_module.generate_image_variants('photo.jpg')
+    variants = sorted(os.listdir(upload_folder / 'variants'))
+    assert variants == sorted(app_module.variant_filename('photo.jpg', size) for size in app_module.app.config['IMAGE_VARIANT_SIZES'])
+    assert client.get('/media/thumb/photo.jpg').headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+def test_undecodable_upload_is_not_requeued(client, upload_folder, monkeypatch):
+    (upload_folder / 'broken.jpg').write_bytes(b'not an image')
+    monkeypatch.setattr(app_module.image_executor, 'submit', lambda fn, *args: fn(*args))
+    app_module.queue_image_variants('broken.jpg')
+    submitted = []
+    monkeypatch.setattr(app_module.image_executor, 'submit', lambda fn, *args: submitted.append(args))
+    assert client.get('/media/thumb/broken.jpg').status_code == 200
+    assert submitted == []
+    assert not os.listdir(upload_folder / 'variants')
+
+
+def test_image_deleted_mid_job_leaves_no_variants(client, upload_folder, monkeypatch):
+    Image.new('RGB', (800, 600), 'red').save(upload_folder / 'photo.jpg')
+    exif_transpose = app_module.ImageOps.exif_transpose
+    def delete_upload(image):
+        # The image is deleted after the job has opened the upload but before it writes any variant.
+        app_module.remove_image_files('photo.jpg')
+        return exif_transpose(image)
+    monkeypatch.setattr(app_module.ImageOps, 'exif_transpose', delete_upload)
+    app_module.generate_image_variants('photo.jpg')
+    assert not os.listdir(upload_folder / 'variants')
+    assert 'photo.jpg' not in app_module.image_jobs_failed
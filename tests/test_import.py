@@ -0,0 +1,39 @@
+import io
+
+from sqlalchemy.exc import IntegrityError
+
+import app as app_module
+from app import import_csv, Customer, Product
+
+
+def test_rejected_rows_are_reported_individually(app, monkeypatch):
+    # Stands in for a database constraint that only some rows violate.
+    def import_batch(rows):
+        if any(row['name'].startswith('Bad') for row in rows): raise IntegrityError('INSERT', {}, Exception('constraint failed'))
+        app_module.import_customer_batch(rows)
+    monkeypatch.setitem(app_module.CSV_IMPORTERS, 'customers', (app_module.parse_customer_row, import_batch))
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 4)
+    names = ['Good 1', 'Bad 1', 'Good 2', 'Good 3', '', 'Good 4', 'Good 5', 'Bad 2', 'Good 6']
+    report = import_csv('customers', io.StringIO('name,phone\n' + ''.join(f'{name},555\n' for name in names)))
+
+    assert report['rows'] == 9
+    assert report['imported'] == 6
+    assert report['errors'] == [
+        {'line': 3, 'message': 'constraint failed'},
+        {'line': 6, 'message': 'name is required'},
+        {'line': 9, 'message': 'constraint failed'},
+    ]
+    assert sorted(c.name for c in Customer.query) == [f'Good {i}' for i in range(1, 7)]
+
+
+def test_lines_are_counted_across_multiline_fields(app):
+    report = import_csv('customers', io.StringIO('name,address\nAlice,"Block 1\nRoad 2"\n,Nowhere\n'))
+    assert report['errors'] == [{'line': 4, 'message': 'name is required'}]
+
+
+def test_reimporting_a_product_without_variants_drops_them(app):
+    import_csv('products', io.StringIO('name,price,variant_name,variant_stock\nShirt,10,S,3\nShirt,10,M,4\n'))
+    assert Product.query.filter_by(name='Shirt').one().variants.count() == 2
+    import_csv('products', io.StringIO('name,price,simple_stock\nShirt,10,7\n'))
+    product = Product.query.filter_by(name='Shirt').one()
+    assert not product.has_variants and product.simple_stock == 7 and product.variants.count() == 0
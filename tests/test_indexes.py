@@ -0,0 +1,51 @@
+import pytest
+
+from app import db, Product, ProductImage
+from conftest import captured_statements, make_customer, make_orders, make_product
+
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            # Test tables are a few rows, so sequential scans are ruled out to see which index the planner would pick.
+            conn.exec_driver_sql('SET enable_seqscan = off')
+            return ' | '.join(row[0] for row in conn.exec_driver_sql(f'EXPLAIN {statement}', parameters))
+        return ' | '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+
+
+def plan_for(client, url, table):
+    statement, parameters = next((s, p) for s, p in captured_statements(client, url) if f'FROM {table}' in s)
+    return query_plan(statement, parameters)
+
+
+def test_orders_page_uses_indexes(client):
+    make_orders(20, make_customer(), make_product())
+    plan = plan_for(client, '/api/orders?limit=10', 'customer_order')
+    # Newest-first keyset paging walks the (order_date, id) index instead of sorting the table,
+    # and the per-order item count is an index lookup on order_item.order_id.
+    assert 'ix_customer_order_order_date_id' in plan
+    assert 'TEMP B-TREE' not in plan
+    assert 'ix_order_item_order_id' in plan
+
+
+def test_order_items_join_uses_index(client):
+    make_orders(20, make_customer(), make_product())
+    plan = plan_for(client, '/api/orders/export?format=ndjson', 'customer_order')
+    assert 'ix_order_item_order_id' in plan
+
+
+def test_product_listing_uses_foreign_key_indexes(client):
+    product = make_product(variants={'S': 1, 'M': 2})
+    db.session.add(ProductImage(product_id=product.id, filename='widget.jpg'))
+    db.session.commit()
+    # Stock totals and thumbnails are correlated subqueries, one index lookup per listed product.
+    plan = plan_for(client, '/api/products', 'product_variant')
+    assert 'ix_product_variant_product_id' in plan
+    assert 'ix_product_image_product_id' in plan
+
+
+def test_name_search_uses_trigram_index(client):
+    if db.engine.dialect.name != 'postgresql': pytest.skip('trigram indexes exist on Postgres only')
+    for i in range(20): db.session.add(Product(name=f'Widget {i}', price=1, has_variants=False, simple_stock=1))
+    db.session.commit()
+    assert 'ix_product_name_trgm' in plan_for(client, '/api/products?search=dget', 'product')
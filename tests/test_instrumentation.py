@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+
+def test_failed_statement_leaves_no_timing_state(client):
+    with db.engine.connect() as conn:
+        with pytest.raises(OperationalError): conn.execute(text('SELECT * FROM no_such_table'))
+        conn.rollback()
+        conn.execute(text('SELECT 1'))
+        assert 'query_started' not in conn.info
+    response = client.get('/api/orders')
+    assert 'queries' in response.headers['Server-Timing']
+
+
+def test_metrics_require_a_configured_token(client, monkeypatch):
+    monkeypatch.setitem(client.application.config, 'METRICS_TOKEN', None)
+    assert client.get('/metrics').status_code == 404
+    monkeypatch.setitem(client.application.config, 'METRICS_TOKEN', 'secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db, Product, ProductVariant
+from conftest import captured_statements, logged_in_client, make_customer, make_orders, make_product
+
+
+def test_parallel_orders_never_oversell(app):
+    product, customer = make_product(stock=3), make_customer()
+    product_id, customer_id = product.id, customer.id
+    db.session.remove()
+
+    def place_order(_):
+        response = logged_in_client(app).post('/api/order/add', json={'customer_id': customer_id, 'items': [{'product_id': product_id, 'quantity': 1}]})
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        statuses = list(pool.map(place_order, range(10)))
+
+    assert statuses.count(200) == 3
+    assert statuses.count(400) == 7
+    assert db.session.get(Product, product_id).simple_stock == 0
+
+
+def test_edit_applies_only_the_difference(client):
+    product = make_product(variants={'S': 10})
+    variant_id, customer = product.variants.first().id, make_customer()
+    order_data = {'customer_id': customer.id, 'status': 'Processing', 'items': [{'product_id': product.id, 'variant_id': variant_id, 'quantity': 4}]}
+    assert client.post('/api/order/add', json=order_data).status_code == 200
+    assert db.session.get(ProductVariant, variant_id).stock == 6
+
+    order_id = client.get('/api/orders').json['orders'][0]['id']
+    order_data['items'][0]['quantity'] = 6
+    assert client.post(f'/api/order/{order_id}/edit', json=order_data).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(ProductVariant, variant_id).stock == 4
+
+    order_data['items'][0]['quantity'] = 1
+    assert client.post(f'/api/order/{order_id}/edit', json=order_data).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(ProductVariant, variant_id).stock == 9
+
+    # Asking for more than is left fails and leaves both the order and the stock as they were.
+    order_data['items'][0]['quantity'] = 11
+    assert client.post(f'/api/order/{order_id}/edit', json=order_data).status_code == 400
+    db.session.expire_all()
+    assert db.session.get(ProductVariant, variant_id).stock == 9
+
+
+def test_bulk_orders_take_stock_for_the_whole_batch(client):
+    product, customer = make_product(stock=5), make_customer()
+    order = lambda quantity: {'customer_id': customer.id, 'items': [{'product_id': product.id, 'quantity': quantity}]}
+    assert client.post('/api/orders/bulk', json={'orders': [order(3), order(3)]}).status_code == 400
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).simple_stock == 5
+
+    assert client.post('/api/orders/bulk', json={'orders': [order(3), order(2)]}).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).simple_stock == 0
+
+
+def test_orders_without_a_reservation_never_release_stock(client):
+    product, customer = make_product(stock=5), make_customer()
+    make_orders(1, customer, product)
+    order_id = client.get('/api/orders').json['orders'][0]['id']
+    order_data = {'customer_id': customer.id, 'status': 'Processing', 'items': [{'product_id': product.id, 'quantity': 3}]}
+    assert client.post(f'/api/order/{order_id}/edit', json=order_data).status_code == 200
+    assert client.post(f'/api/order/{order_id}/delete').status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).simple_stock == 5
+
+
+def test_order_listing_query_count_is_constant(client):
+    product = make_product()
+    customers = [make_customer(f'Customer {i}') for i in range(5)]
+    make_orders(3, customers[0], product)
+    few = len(captured_statements(client, '/api/orders?limit=200'))
+    for customer in customers: make_orders(30, customer, product)
+    many = len(captured_statements(client, '/api/orders?limit=200'))
+    assert few == many
@@ -0,0 +1,24 @@
+from app import bump_versions, db, ProductImage
+from conftest import captured_statements, make_product
+
+
+def test_listing_totals_stock_and_picks_first_image(client):
+    plain = make_product('Plain', stock=7)
+    sized = make_product('Sized', variants={'S': 2, 'L': 3})
+    sized.images.append(ProductImage(filename='second.jpg', id=20))
+    sized.images.append(ProductImage(filename='first.jpg', id=10))
+    db.session.commit()
+    products = {p['name']: p for p in client.get('/api/products').json['products']}
+    assert (products['Plain']['stock'], products['Plain']['thumbnail']) == (7, None)
+    assert (products['Sized']['stock'], products['Sized']['thumbnail']) == (5, 'first.jpg')
+
+
+def test_listing_query_count_is_constant(client):
+    make_product('Product 0', variants={'S': 1})
+    few = len(captured_statements(client, '/api/products?limit=200'))
+    for i in range(1, 40): make_product(f'Product {i}', variants={'S': 1, 'M': 2} if i % 2 else None)
+    # Rows inserted directly skip the API's version bump, which would otherwise answer from the response cache.
+    bump_versions('products')
+    db.session.commit()
+    many = len(captured_statements(client, '/api/products?limit=200'))
+    assert few == many